@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+"""
+Miau benchmarks: time the stages of the pipeline on synthetic corpora
+
+Usage:
+  bench.py [--words <n> --clips <n> --lines <n> --overlap <ratio> --seed <n>]
+           [--audio <kind> --video --output <json> --baseline <json> --tolerance <ratio>]
+           [--workdir <dir> --repeat <n>]
+  bench.py -h | --help
+
+Options:
+  --words <n>           Words per transcript [default: 2000]
+  --clips <n>           Number of clips [default: 2]
+  --lines <n>           Number of remix lines [default: 50]
+  --overlap <ratio>     Ratio of remix lines overlapping a previous one [default: 0.3]
+  --seed <n>            Random seed [default: 0]
+  --audio <kind>        "tones" (one beep per word, exact timings) or "espeak"
+                        (speech matching the transcript) [default: tones]
+  --video               Generate video clips (ffmpeg's test pattern) instead of wav.
+  --output <json>       Write the results as json.
+  --baseline <json>     Compare against a previous --output. Exit with an error
+                        if a stage is slower than the tolerance.
+  --tolerance <ratio>   Allowed slowdown against the baseline [default: 0.2]
+  --workdir <dir>       Where to generate the corpus (default to a temporary dir).
+  --repeat <n>          Times each stage is run. The best time is kept, and the
+                        spread of the times tells noise from slowdowns [default: 3]
+
+Every corpus is generated offline and is reproducible for a given seed.
+Stages that need aeneas are skipped if it's not installed.
+
+The startup of a fresh interpreter importing miau and running "miau --help"
+is timed too. It fails if aeneas, langdetect, moviepy or numpy are imported
+eagerly.
+"""
+
+from collections import OrderedDict
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+from docopt import docopt
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+import miau  # noqa
+
+
+VOCABULARY = (
+    'people country work government world time year nation future economy '
+    'education health freedom justice security growth jobs children family '
+    'peace history change promise together hope trust energy industry city '
+    'public money taxes market europe union citizens rights duty respect'
+).split()
+
+# modules miau must import only when they're needed
+HEAVY_MODULES = ('aeneas', 'langdetect', 'moviepy', 'numpy')
+
+RATE = 16000
+WORD_DURATION = 0.3     # seconds of tone per word in "tones" corpora
+WORD_GAP = 0.1
+
+# runs of each stage a comparison with a baseline needs to estimate its noise
+MIN_COMPARE_REPEAT = 3
+# standard deviations a stage must slow down by to not be taken as noise
+NOISE_DEVIATIONS = 3
+# seconds of noise assumed at least, for stages taking a few milliseconds
+MIN_NOISE = 0.01
+
+
+def make_transcript(rng, words):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+_tones = {}
+
+
+def tone(word):
+    """pcm16 samples of a beep with its own pitch for each word of the vocabulary"""
+    if word not in _tones:
+        frequency = 200 + 20 * VOCABULARY.index(word)
+        _tones[word] = b''.join(
+            struct.pack('<h', int(16000 * math.sin(2 * math.pi * frequency * i / RATE)))
+            for i in range(int(WORD_DURATION * RATE))
+        )
+    return _tones[word]
+
+
+def write_tones(filename, transcript):
+    """
+    write a wav with a beep per word of the transcript.
+    Return the exact (begin, end) of each word.
+    """
+    gap = b'\0\0' * int(WORD_GAP * RATE)
+    step = WORD_DURATION + WORD_GAP
+    words = transcript.split()
+    out = wave.open(filename, 'wb')
+    out.setnchannels(1)
+    out.setsampwidth(2)
+    out.setframerate(RATE)
+    out.writeframes(b''.join(tone(word) + gap for word in words))
+    out.close()
+    return [(i * step, i * step + WORD_DURATION) for i in range(len(words))]
+
+
+def to_video(audio, filename):
+    duration = miau.media_duration(audio)
+    miau.ffmpeg('-f', 'lavfi', '-i', 'testsrc=size=640x360:rate=25', '-i', audio,
+                '-t', '{:.3f}'.format(duration), '-c:v', 'libx264', '-g', '50',
+                '-pix_fmt', 'yuv420p', '-c:a', 'aac', filename)
+
+
+def make_corpus(workdir, words, clips, lines, overlap, seed, audio='tones', video=False):
+    """
+    generate ``clips`` media files with their transcripts and a remix
+    script of ``lines`` verses, ``overlap`` of them sharing words with
+    a previous verse. Return the inputs and, for tones corpora, the
+    expected remix data.
+    """
+    rng = random.Random(seed)
+    media, transcripts, timings, tokens_by_clip = [], [], [], []
+    for i in range(clips):
+        transcript = make_transcript(rng, words)
+        base = os.path.join(workdir, 'clip{}'.format(i))
+        with open(base + '.txt', 'w') as fh:
+            fh.write(transcript)
+        tokens_by_clip.append(transcript.split())
+        if audio == 'espeak':
+            subprocess.check_call(['espeak', '-w', base + '.wav', '-f', base + '.txt'])
+            timings.append(None)
+        else:
+            timings.append(write_tones(base + '.wav', transcript))
+        if video:
+            to_video(base + '.wav', base + '.mp4')
+            media.append(base + '.mp4')
+        else:
+            media.append(base + '.wav')
+        transcripts.append(base + '.txt')
+
+    remix_lines = OrderedDict()
+    remix_data = []
+    spans = []
+    while len(remix_lines) < lines:
+        if spans and rng.random() < overlap:
+            # shift a previous verse a word or two
+            clip, start, length = rng.choice(spans)
+            start = max(0, start + rng.choice([-2, -1, 1, 2]))
+        else:
+            clip, start = rng.randrange(clips), rng.randrange(words - 8)
+            length = rng.randint(2, 6)
+        tokens = tokens_by_clip[clip][start:start + length]
+        line = ' '.join(tokens)
+        if line in remix_lines or len(tokens) < 2:
+            continue
+        spans.append((clip, start, length))
+        remix_lines[line] = {'offset_begin': 0, 'offset_end': 0}
+        if timings[clip]:
+            remix_data.append((line, {
+                'begin': timings[clip][start][0],
+                'end': timings[clip][start + len(tokens) - 1][1],
+                'clip': media[clip]
+            }))
+
+    remix = os.path.join(workdir, 'remix.txt')
+    with open(remix, 'w') as fh:
+        fh.write('\n'.join(remix_lines))
+    return media, transcripts, remix_lines, remix_data or None
+
+
+def timing(times):
+    """the best of ``times`` and their standard deviation"""
+    spread = statistics.stdev(times) if len(times) > 1 else 0
+    return {'seconds': round(min(times), 4), 'spread': round(spread, 4)}
+
+
+def measure(stages, stage, function, repeat=1):
+    """
+    run ``function`` once tracing its peak python memory, and then
+    ``repeat`` times untraced, keeping the best time and the spread.
+    Return the result of the last run.
+    """
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    stages[stage] = dict(timing(times), peak_python_bytes=peak)
+    return result
+
+
+def measure_startup(stages, repeat=1):
+    """
+    time ``import miau`` and ``miau --help`` in fresh interpreters.
+    Return the heavy modules loaded by the import.
+    """
+    code = (
+        'import sys, time; start = time.perf_counter(); import miau; '
+        'print(time.perf_counter() - start); '
+        'print(" ".join(m for m in {!r} if m in sys.modules))'.format(HEAVY_MODULES)
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [ROOT] + [p for p in [os.environ.get('PYTHONPATH')] if p]
+    ))
+    import_times, help_times = [], []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', code], env=env,
+                                         universal_newlines=True).split('\n')
+        import_times.append(float(output[0]))
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, os.path.join(ROOT, 'miau.py'), '--help'],
+                              env=env, stdout=subprocess.DEVNULL)
+        help_times.append(time.perf_counter() - start)
+    stages['import'] = timing(import_times)
+    stages['cli_help'] = timing(help_times)
+    return output[1].split()
+
+
+def aeneas_available():
+    try:
+        import aeneas  # noqa
+    except ImportError:
+        return False
+    return True
+
+
+def run(args):
+    workdir = args['--workdir'] or tempfile.mkdtemp(prefix='miau-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    params = OrderedDict([
+        ('words', int(args['--words'])),
+        ('clips', int(args['--clips'])),
+        ('lines', int(args['--lines'])),
+        ('overlap', float(args['--overlap'])),
+        ('seed', int(args['--seed'])),
+        ('audio', args['--audio']),
+        ('video', args['--video']),
+    ])
+    repeat = int(args['--repeat'])
+    stages = OrderedDict()
+    eager_imports = measure_startup(stages, repeat)
+    try:
+        start = time.perf_counter()
+        media, transcripts, remix_lines, remix_data = make_corpus(workdir, **params)
+        corpus_seconds = round(time.perf_counter() - start, 4)
+        texts = [miau.read_transcript(transcript) for transcript in transcripts]
+        lines = list(remix_lines)
+
+        def fragment():
+            pending = lines
+            for text in texts:
+                _, pending = miau.fragmenter(text, pending)
+
+        def word_index():
+            for text in texts:
+                index = miau.WordIndex(text.split())
+                for line in lines:
+                    index.find(line)
+
+        measure(stages, 'fragmenter', fragment, repeat)
+        measure(stages, 'word_index', word_index, repeat)
+
+        if aeneas_available():
+            fragments = measure(stages, 'get_fragments_database', lambda: miau.get_fragments_database(
+                media, transcripts, remix_lines, force_language='en'
+            ), repeat)
+            if remix_data is None:
+                remix_data = miau.apply_offsets(remix_lines, fragments)
+
+        if remix_data is not None:
+            output_type = 'video' if params['video'] else 'audio'
+            extension = 'mp4' if params['video'] else 'wav'
+            engines = ['moviepy', 'stream'] + (['ffmpeg'] if params['video'] else [])
+            for engine in engines:
+                output = os.path.join(workdir, 'remix-{}.{}'.format(engine, extension))
+
+                def render():
+                    mvp_clips = miau.LazyClips(output_type)
+                    try:
+                        miau.render(remix_data, output, output_type, mvp_clips, engine=engine)
+                    finally:
+                        mvp_clips.close()
+
+                measure(stages, 'render_{}'.format(engine), render, repeat)
+    finally:
+        if not args['--workdir']:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return OrderedDict([
+        ('params', params),
+        ('corpus_seconds', corpus_seconds),
+        ('stages', stages),
+        ('eager_imports', eager_imports),
+        ('max_rss_kb', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+        ('max_rss_children_kb', resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('timestamp', time.strftime('%Y-%m-%dT%H:%M:%S')),
+    ])
+
+
+def compare(results, baseline, tolerance):
+    """
+    print each stage against the baseline. Return the stages that got
+    slower by more than the ``tolerance`` ratio and than the noise, a few
+    standard deviations of the times of either run.
+    """
+    slower = []
+    print('{:<26}{:>12}{:>12}{:>9}{:>9}'.format('stage', 'baseline', 'current', 'ratio', 'noise'))
+    for stage, current in results['stages'].items():
+        before = baseline['stages'].get(stage)
+        if not before:
+            print('{:<26}{:>12}{:>12.4f}'.format(stage, '-', current['seconds']))
+            continue
+        ratio = current['seconds'] / max(before['seconds'], 1e-9)
+        noise = NOISE_DEVIATIONS * max(current.get('spread', 0), before.get('spread', 0), MIN_NOISE)
+        print('{:<26}{:>12.4f}{:>12.4f}{:>9.2f}{:>9.4f}'.format(
+            stage, before['seconds'], current['seconds'], ratio, noise)
+        )
+        if ratio > 1 + tolerance and current['seconds'] - before['seconds'] > noise:
+            slower.append(stage)
+    return slower
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+    if args['--baseline']:
+        with open(args['--baseline']) as fh:
+            baseline = json.load(fh)
+        for key in ('words', 'clips', 'lines', 'overlap', 'seed', 'audio', 'video'):
+            # run with the same corpus than the baseline
+            value = baseline['params'][key]
+            args['--{}'.format(key)] = value if isinstance(value, bool) else str(value)
+        if int(args['--repeat']) < MIN_COMPARE_REPEAT:
+            # a single run can't tell a slowdown from noise
+            args['--repeat'] = str(MIN_COMPARE_REPEAT)
+
+    results = run(args)
+    if args['--output']:
+        with open(args['--output'], 'w') as fh:
+            json.dump(results, fh, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if results['eager_imports']:
+        sys.exit('Imported when miau is imported: {}'.format(', '.join(results['eager_imports'])))
+    if args['--baseline']:
+        slower = compare(results, baseline, float(args['--tolerance']))
+        if slower:
+            sys.exit('Slower than baseline: {}'.format(', '.join(slower)))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,42 +3,192 @@
 Miau: Remix speeches for fun and profit
 
 Usage:
-  miau <input_files>... -r <remix> [-o <output> -d <dump> --lang <lang> --debug]
+  miau serve <input_files>... [--host <host> --port <port> --workers <n> --queue <n>]
+                             [--lang <lang> --debug --cache-dir <dir> --no-cache]
+                             [--words --windowed --jobs <n> --engine <engine>]
+                             [--incremental --clear-cache --preview --captions]
+                             [--index --chunks <n> --snap --profile <json>]
+                             [--profile-stats <stats> --crossfade <s>]
+  miau <input_files>... (-r <remix> | -m <manifest>)...
+                        [-o <output> -d <dump> --lang <lang> --debug]
+                        [--cache-dir <dir> --no-cache --words --windowed]
+                        [--jobs <n> --engine <engine> --workers <n>]
+                        [--incremental --clear-cache --preview --captions]
+                        [--index --chunks <n> --snap --profile <json>]
+                        [--profile-stats <stats> --pipeline --watch]
+                        [--crossfade <s>]
   miau -h | --help
   miau --version
 
 Options:
-  <input_files>             Input files patterns (clip/s and its transcripts)
-  -r --remix <remix>        Script text (txt or json)
+  <input_files>             Input files patterns (clip/s and its transcripts).
+                            Transcripts can be subtitles (.srt or .vtt):
+                            verses are timed by their cues.
+  -r --remix <remix>        Script text (txt or json). Repeat it to render
+                            many remixes at once.
+  -m --manifest <manifest>  Json list of remixes to render at once, each one
+                            a filename or {"remix": .., "output": .., "dump": ..}
   -d --dump <json>          Dump remix as json.
                             Can be loaded with -r to reuse the aligment.
   -o --output <output>      Output filename (default to mp4 with remix's basename)
+                            Only for a single remix. An .m3u8 is an HLS
+                            playlist, updated as each verse is encoded.
   -h --help                 Show this screen.
   --lang <lang>             Set language (2-letter code) for inputs (default autodetect)
+  --cache-dir <dir>         Directory of the caches: forced alignments,
+                            probes, extracted and decoded audio, energy
+                            envelopes, rendered segments and the transcript
+                            index. Each one is bounded, about 8GB in all.
+                            [default: ~/.cache/miau]
+  --no-cache                Don't use the cache: always force the alignment.
+  --words                   Align each transcript once, word by word, and
+                            resolve remix verses by lookup. Verses must
+                            start and end at word boundaries.
+  --windowed                Only align an excerpt of the audio and the text
+                            around the estimated position of each verse.
+  -j --jobs <n>             Number of alignments to run in parallel [default: 1]
+  --engine <engine>         How to render the output: "moviepy", "ffmpeg",
+                            "stream" or "pcm". ffmpeg copies the streams
+                            between keyframes and only re-encodes around the
+                            cuts. stream writes segment after segment,
+                            keeping a single clip open, with bounded memory.
+                            pcm (audio only) slices the raw audio of each
+                            clip, decoded once and cached [default: moviepy]
+  --crossfade <s>           Seconds each verse fades into the next one with
+                            the pcm engine [default: 0]
+  --workers <n>             Number of remixes rendered in parallel [default: 1]
+  --snap                    Move each cut to the quietest point of the audio
+                            up to 0.15s around the aligned one, if there is
+                            a clear pause. The + and - of the remix are
+                            applied after that.
+  --chunks <n>              Split the remix in n pieces rendered in parallel
+                            processes and joined without re-encoding the
+                            video. Frames are those of "--engine stream".
+                            [default: 1]
+  --pipeline                Cut each verse with ffmpeg as soon as its clip
+                            is aligned, while the other clips are still
+                            being aligned. Only for a single remix; the
+                            other render options are ignored.
+  --watch                   Keep running and render the remix again each
+                            time it or an input changes, aligning only the
+                            new verses and, with --incremental, encoding
+                            only the new segments. Only for a single remix.
+  --incremental             Cache each rendered segment and reuse it while
+                            its clip, begin, end and settings don't change.
+  --clear-cache             Remove the cached segments before rendering.
+  --preview                 Fast draft render: low resolution, frame rate and
+                            bitrate with the fastest encoder preset.
+  --captions                Burn each verse and its timing into the preview.
+  --index                   Find the clips saying each verse in a full text
+                            index of the transcripts, kept in the cache dir
+                            and updated when they change. Verses are aligned
+                            from the clips covering most of them.
+  --host <host>             Address the server listens to [default: 127.0.0.1]
+  --port <port>             Port the server listens to [default: 8000]
+  --queue <n>               Maximum number of jobs waiting to be rendered
+                            [default: 16]
+  --profile <json>          Write the time spent in each stage, by clip and
+                            by alignment pass, and some counters as json.
+  --profile-stats <stats>   Dump cProfile stats of the hot stages (fragmenter,
+                            aeneas, make_remix and write), to read with pstats.
   --version                 Show version.
 """
 
-from collections import OrderedDict
+import asyncio
+from collections import Counter, OrderedDict, defaultdict, deque
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import cProfile
+from functools import partial
 import glob
-from itertools import chain
+import hashlib
+import heapq
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate, chain
 import json
 import logging
+import math
 import os
+import queue
 import re
+import shutil
+import sqlite3
+import struct
+import subprocess
 import tempfile
+import threading
+import time
+import uuid
 
-from aeneas.tools.execute_task import ExecuteTaskCLI
 from docopt import docopt, DocoptExit
-import langdetect
-from moviepy.editor import (
-    VideoFileClip, AudioFileClip,
-    concatenate_videoclips, concatenate_audioclips
-)
-from moviepy.tools import extensions_dict
+
+# aeneas, langdetect and moviepy take seconds to import. They are
+# imported by the functions using them, so the paths not aligning or
+# rendering (--help, input errors, remixes dumped as json) start fast.
 
 
 VERSION = '0.1'
 
+CACHE_MAX_SIZE = 256 * 1024 ** 2     # bytes, per cache namespace
+SEGMENT_CACHE_MAX_SIZE = 2 * 1024 ** 3
+AUDIO_CACHE_MAX_SIZE = 1024 ** 3
+PCM_CACHE_MAX_SIZE = 4 * 1024 ** 3
+
+# schema of the transcript index. Indexes of other versions are rebuilt
+INDEX_VERSION = 2
+
+JOBS_RETENTION = 64     # finished jobs the server keeps, with their outputs
+
+# draft quality for --preview
+PREVIEW_HEIGHT = 240
+PREVIEW_VIDEO_PARAMS = {'fps': 12, 'preset': 'ultrafast', 'bitrate': '200k', 'audio_bitrate': '48k'}
+PREVIEW_AUDIO_PARAMS = {'fps': 22050, 'bitrate': '48k'}
+
+WINDOW_PADDING = 15      # seconds around the estimated position of a verse
+WINDOW_RETRIES = 3       # times a window is doubled before aligning the whole clip
+WINDOW_MIN_EDGE = 0.1    # seconds. Shorter context fragments mean a missed window
+
+RENDER_ENGINES = ('moviepy', 'ffmpeg', 'stream', 'pcm')
+
+STREAM_AUDIO_FPS = 44100
+STREAM_CHUNK_SIZE = 2 ** 16      # audio samples read at once by the stream engine
+
+PCM_RATE = 44100     # of the raw stereo float32 audio of the pcm engine
+
+# seconds the duration of a remix joined from pieces may differ from its segments
+DURATION_TOLERANCE = 0.1
+
+# encoders able to reproduce a stream to join it with stream copied pieces
+VIDEO_ENCODERS = {'h264': 'libx264', 'hevc': 'libx265', 'vp8': 'libvpx', 'vp9': 'libvpx-vp9'}
+AUDIO_ENCODERS = {'aac': 'aac', 'mp3': 'libmp3lame', 'opus': 'libopus', 'vorbis': 'libvorbis'}
+
+DURATION_PATTERN = re.compile(r'Duration: (\d+):(\d+):([\d.]+)')
+STREAM_PATTERN = re.compile(r'Stream #\d+:\d+.*?: (?P<type>Video|Audio): (?P<codec>\w+)(?P<info>.*)')
+
+SNAP_TOLERANCE = 0.15    # seconds a cut can be moved to reach a quieter point
+SNAP_HOP = 0.01          # seconds of audio per value of the energy envelope
+SNAP_RATE = 16000
+SNAP_QUIET = 0.25        # energy of a point to snap to, relative to the loudest one in reach
+
+# seconds between two checks of the files watched
+WATCH_INTERVAL = 0.5
+
+SUBTITLE_EXTENSIONS = ('.srt', '.vtt')
+SUBTITLE_PADDING = 0.5   # seconds of audio around the cues of a verse not matching whole cues
+
+PLAYLIST_EXTENSIONS = ('.m3u8',)
+# fragmented mp4 segments playable by browsers' HLS players
+HLS_CODECS = ('libx264', 'aac')
+HLS_MUXER = ('-f', 'mp4', '-movflags', '+frag_keyframe+empty_moov+default_base_moof')
+MP4_CONTAINERS = (b'moov', b'trak', b'mdia', b'moof', b'traf')
+
+# stages run under cProfile with --profile-stats
+HOT_STAGES = ('fragmenter', 'aeneas', 'make_remix', 'write')
+
+TIMESTAMP_PATTERN = re.compile(r'(?:(\d+):)?(\d+):(\d+)[,.](\d+)')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+
 OFFSET_PATTERN = re.compile('^(?P<offset_begin>(\+|\-)+)?(?P<line>.*?)(?P<offset_end>(\+|\-)+)?$')
 
 logging.basicConfig(format='[miau] %(asctime)s %(levelname)s: %(message)s',
@@ -46,6 +196,363 @@ logging.basicConfig(format='[miau] %(asctime)s %(levelname)s: %(message)s',
                     datefmt='%Y-%m-%d %H:%M:%S')
 
 
+
+class Profiler(object):
+    """
+    timers and counters of the stages of a run, reported by ``--profile``.
+
+    Each timing may be labeled with the clip and the pass (e.g. the
+    alignment step of that clip) it belongs to. After
+    :meth:`enable_cprofile`, the ``HOT_STAGES`` also run under cProfile.
+
+    >>> profiler = Profiler()
+    >>> with profiler.stage('fragmenter', clip='speech.mp4'):
+    ...     fragmenter(text, lines)
+    >>> profiler.count('segments')
+    >>> profiler.report()['stages']
+    {'fragmenter': {'calls': 1, 'seconds': 0.0021}}
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cprofile = None
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.timings = []       # (stage, seconds, clip, step)
+        self.counters = Counter()
+        self._hot = False
+
+    def enable_cprofile(self):
+        self.cprofile = cProfile.Profile()
+
+    def add(self, name, seconds, clip=None, step=None):
+        with self.lock:
+            self.timings.append((name, seconds, clip, step))
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def merge(self, records):
+        """add the timings and counters of another profiler (see :func:`_profiled`)"""
+        timings, counters = records
+        with self.lock:
+            self.timings.extend(tuple(timing) for timing in timings)
+            self.counters.update(counters)
+
+    def records(self):
+        return self.timings, dict(self.counters)
+
+    @contextmanager
+    def stage(self, name, clip=None, step=None):
+        """time the block as the stage ``name``"""
+        hot = False
+        if self.cprofile is not None and name in HOT_STAGES:
+            # cProfile can't be enabled twice: nested or concurrent
+            # hot stages are covered by the first one
+            with self.lock:
+                hot, self._hot = not self._hot, True
+        if hot:
+            self.cprofile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, clip, step)
+            if hot:
+                self.cprofile.disable()
+                self._hot = False
+
+    def report(self):
+        """return the timings summed by stage and by clip, the passes and the counters"""
+        stages = OrderedDict()
+        clips = OrderedDict()
+        passes = []
+        for name, seconds, clip, step in self.timings:
+            stage = stages.setdefault(name, {'calls': 0, 'seconds': 0})
+            stage['calls'] += 1
+            stage['seconds'] += seconds
+            if clip is not None:
+                by_clip = clips.setdefault(clip, OrderedDict())
+                by_clip[name] = by_clip.get(name, 0) + seconds
+            if step is not None:
+                passes.append(OrderedDict([
+                    ('stage', name), ('clip', clip), ('step', step), ('seconds', round(seconds, 4))
+                ]))
+        for stage in stages.values():
+            stage['seconds'] = round(stage['seconds'], 4)
+        for by_clip in clips.values():
+            for name in by_clip:
+                by_clip[name] = round(by_clip[name], 4)
+        return OrderedDict([
+            ('total_seconds', round(time.perf_counter() - self.started, 4)),
+            ('stages', stages),
+            ('clips', clips),
+            ('passes', passes),
+            ('counters', OrderedDict(sorted(self.counters.items()))),
+        ])
+
+    def dump(self, filename=None, stats=None):
+        """write the report as json to ``filename`` and cProfile's stats to ``stats``"""
+        if filename:
+            logging.info('Writing profile report to %s', filename)
+            with open(filename, 'w') as fh:
+                json.dump(self.report(), fh, indent=2)
+        if stats and self.cprofile is not None:
+            logging.info('Writing cProfile stats to %s', stats)
+            self.cprofile.dump_stats(stats)
+
+
+profiler = Profiler()
+
+
+def _profiled(function, *args, **kwargs):
+    """
+    run ``function`` timing it with a fresh :data:`profiler`. Return its
+    result and the records to :meth:`Profiler.merge`. Used in worker
+    processes, whose timings would be lost otherwise.
+    """
+    global profiler
+    parent, profiler = profiler, Profiler()
+    try:
+        return function(*args, **kwargs), profiler.records()
+    finally:
+        profiler = parent
+
+
+_file_hashes = {}
+
+
+def file_hash(filename, blocksize=2 ** 20):
+    """
+    return the sha1 hexdigest of the content of ``filename``.
+
+    Digests are memoized by path, size and modification time,
+    so a clip is read at most once per run.
+    """
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime)
+    if key not in _file_hashes:
+        sha = hashlib.sha1()
+        with open(filename, 'rb') as fh:
+            for block in iter(lambda: fh.read(blocksize), b''):
+                sha.update(block)
+        _file_hashes[key] = sha.hexdigest()
+    return _file_hashes[key]
+
+
+class DiskCache(object):
+    """
+    A directory of files addressed by a hash key, bounded in size.
+
+    Reading an entry touches its modification time so, when the
+    directory grows beyond ``max_size`` bytes, the least recently used
+    entries are evicted first.
+
+    >>> cache = DiskCache('/tmp/miau/alignments')
+    >>> key = cache.key(file_hash('speech.mp4'), 'some text', 'en')
+    >>> cache.load_json(key) is None
+    True
+    >>> cache.dump_json(key, {'fragments': []})
+    >>> cache.load_json(key)
+    {'fragments': []}
+    """
+
+    def __init__(self, path, max_size=CACHE_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        sha = hashlib.sha1()
+        for part in parts:
+            sha.update(u'{}'.format(part).encode('utf-8'))
+            sha.update(b'\0')
+        return sha.hexdigest()
+
+    def filename(self, key, suffix=''):
+        return os.path.join(self.path, key + suffix)
+
+    def lookup(self, key, suffix=''):
+        """return the filename of the entry for ``key`` or ``None`` on a miss"""
+        filename = self.filename(key, suffix)
+        try:
+            os.utime(filename, None)
+        except OSError:
+            return None
+        return filename
+
+    def store(self, key, source, suffix=''):
+        """
+        move the file ``source`` into the cache. Return its new filename.
+
+        A file larger than the whole cache isn't stored: ``source`` is
+        left where it is and returned.
+        """
+        if os.path.getsize(source) > self.max_size:
+            logging.debug('Not caching %s: larger than the cache', source)
+            return source
+        filename = self.filename(key, suffix)
+        # a name of its own, for writers storing the same key at once
+        fd, temporary = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        os.close(fd)
+        shutil.move(source, temporary)
+        os.replace(temporary, filename)
+        self.evict(keep=filename)
+        return filename
+
+    def load_json(self, key):
+        filename = self.lookup(key, '.json')
+        if filename is None:
+            return None
+        with open(filename) as fh:
+            return json.load(fh)
+
+    def dump_json(self, key, data):
+        with tempfile.NamedTemporaryFile('w', dir=self.path, suffix='.tmp', delete=False) as fh:
+            json.dump(data, fh)
+        if self.store(key, fh.name, '.json') == fh.name:
+            os.remove(fh.name)
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            os.remove(os.path.join(self.path, name))
+
+    def evict(self, keep=None):
+        """remove the least recently used entries, but ``keep``, until the cache fits"""
+        entries, total = [], 0
+        for name in os.listdir(self.path):
+            if name.endswith('.tmp'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            total += stat.st_size
+            if os.path.join(self.path, name) != keep:
+                entries.append((stat.st_mtime, stat.st_size, name))
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            logging.debug('Evicting %s from cache', name)
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                continue
+            total -= size
+
+
+def find_occurrences(text, patterns, every=False):
+    """
+    return a dictionary mapping each pattern found in ``text``
+    to the position of its leftmost occurrence or, if ``every`` is
+    ``True``, to the list of positions of all of them.
+
+    Every pattern is searched at once in a single scan of the text,
+    using an Aho-Corasick automaton.
+
+    >>> find_occurrences('the true meaning of the truth', ['true', 'truth', 'lie'])
+    {'true': 4, 'truth': 24}
+    >>> find_occurrences('the truth is the true truth', ['truth', 'true'], every=True)
+    {'truth': [4, 22], 'true': [17]}
+    """
+    # build the trie. ``outputs`` holds the patterns ending at each node
+    goto = [{}]
+    outputs = [[]]
+    for pattern in patterns:
+        if not pattern:
+            continue
+        node = 0
+        for char in pattern:
+            if char not in goto[node]:
+                goto[node][char] = len(goto)
+                goto.append({})
+                outputs.append([])
+            node = goto[node][char]
+        outputs[node].append(pattern)
+
+    # failure links, breadth first
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for char, child in goto[node].items():
+            queue.append(child)
+            state = fail[node]
+            while state and char not in goto[state]:
+                state = fail[state]
+            fail[child] = goto[state].get(char, 0)
+            outputs[child] = outputs[child] + outputs[fail[child]]
+
+    found = {}
+    pending = len(set(p for p in patterns if p))
+    node = 0
+    for position, char in enumerate(text):
+        while node and char not in goto[node]:
+            node = fail[node]
+        node = goto[node].get(char, 0)
+        for pattern in outputs[node]:
+            if every:
+                found.setdefault(pattern, []).append(position - len(pattern) + 1)
+            elif pattern not in found:
+                found[pattern] = position - len(pattern) + 1
+                pending -= 1
+        if not pending:
+            break
+    return found
+
+
+def _fits(intervals, start, end):
+    # whether [start, end) doesn't overlap the sorted ``intervals``
+    i = bisect_left(intervals, (start, end))
+    return (not i or intervals[i - 1][1] <= start) and (
+        i == len(intervals) or end <= intervals[i][0]
+    )
+
+
+def _pack(occurrences, lines):
+    # place each line, in the order given, in the first pass where any of
+    # its occurrences fits, opening a new pass for its leftmost one otherwise
+    passes = []
+    for line in lines:
+        for intervals in passes:
+            start = next((start for start in occurrences[line]
+                          if _fits(intervals, start, start + len(line))), None)
+            if start is not None:
+                insort(intervals, (start, start + len(line)))
+                break
+        else:
+            start = occurrences[line][0]
+            passes.append([(start, start + len(line))])
+    return passes
+
+
+def plan_passes(occurrences):
+    """
+    distribute the lines of ``occurrences`` (as returned by
+    :func:`find_occurrences` with ``every=True``) in groups of non
+    overlapping ``(start, end)`` intervals, one occurrence of each line.
+
+    Lines are placed greedily, each one in the first group where one of
+    its occurrences fits, trying a few orders (the lines with fewer
+    occurrences first, leftmost first and longest first) and keeping the
+    plan with the fewest groups. It's a heuristic: it isn't guaranteed
+    to be the minimum.
+
+    >>> plan_passes({'out the true': [62], 'the true meaning': [66], 'I have': [0]})
+    [[(0, 6), (62, 74)], [(66, 82)]]
+    """
+    orders = [
+        sorted(occurrences, key=lambda line: (len(occurrences[line]), occurrences[line][0])),
+        sorted(occurrences, key=lambda line: occurrences[line][0]),
+        sorted(occurrences, key=lambda line: (-len(line), occurrences[line][0])),
+    ]
+    return min((_pack(occurrences, lines) for lines in orders), key=len)
+
+
 def fragmenter(source, remix_lines, debug=False):
     """
     return as many versions of the source text
@@ -53,6 +560,10 @@ def fragmenter(source, remix_lines, debug=False):
     appears as an independent line at least once as an
     independent line (if it exists)
 
+    Every occurrence of each verse is located with :func:`find_occurrences`
+    and one of them is wrapped in one of the versions planned by
+    :func:`plan_passes`.
+
     >>> fragmenter('I have a dream that one day this nation will rise up '
             'and live out the true meaning of its creed',
         ['I have a dream',
@@ -66,44 +577,28 @@ def fragmenter(source, remix_lines, debug=False):
 
 
     """
+    occurrences = find_occurrences(source, remix_lines, every=True)
 
     # fragments not present in this source.
-    not_found_on_source = []
-    for line in remix_lines:
-        if line not in source:
-            not_found_on_source.append(line)
-
-    def iterate(lines):
-
-        current = source
-        not_found = []
-        for line in lines:
-            if line in not_found_on_source:
-                continue
-
-            if line not in current:
-                not_found.append(line)
-                continue
-            current = current.replace(line, '\n{}\n'.format(line))
-        current = current.replace('\n ', '\n').replace('\n\n', '\n')
-        return current, not_found
+    not_found_on_source = [line for line in remix_lines if line not in occurrences]
 
     results = []
-    count = 1
-    while True:
+    for count, intervals in enumerate(plan_passes(occurrences), 1):
         logging.info('Fragmenting source. Iteration %s', count)
-        result, not_found = iterate(remix_lines)
+        pieces = []
+        last = 0
+        for start, end in intervals:
+            pieces.append(source[last:start])
+            pieces.append('\n{}\n'.format(source[start:end]))
+            last = end
+        pieces.append(source[last:])
+        result = ''.join(pieces).replace('\n ', '\n').replace('\n\n', '\n')
         if debug:
             d = tempfile.mkstemp(suffix='-iter{}.txt'.format(count))[1]
             logging.debug('Writing fragmented source to {}'.format(d))
             with open(d, 'w') as _t:
                 _t.write(result)
-        count += 1
         results.append(result)
-        if not not_found:
-            # finish, as all remix lines were found
-            break
-        remix_lines = not_found
 
     return results, not_found_on_source
 
@@ -131,7 +626,535 @@ def fine_tuning(raw_line, offset_step=0.05):
     return {line: {k: _offset(v) for k, v in result.items()}}
 
 
-def make_remix(remix_data, mvp_clips, output_type):
+def render_segments(remix_data, output_file, output_type, mvp_clips, cache, params=None,
+                    preview=False, captions=False, hash_clips=True):
+    """
+    render each segment of the remix to its own file, reusing the ones
+    found in ``cache`` (a :class:`DiskCache`), and join them without
+    re-encoding.
+
+    Segments are keyed by the content of their clip, their begin and end,
+    and the output settings: after tuning one verse of a dumped remix,
+    only that verse is encoded again.
+
+    :param params: extra arguments for moviepy's ``write_videofile`` or
+                   ``write_audiofile``.
+    :param preview: render draft quality segments (see :func:`remix_segment`)
+    :param captions: burn each verse in the preview
+    :param hash_clips: if ``False``, key segments by the path of their clip
+                       instead of its content, for a cache used in a single run.
+    """
+    params = params or {}
+    extension = os.path.splitext(output_file)[1]
+    method = 'write_videofile' if output_type == 'video' else 'write_audiofile'
+    workdir = tempfile.mkdtemp(prefix='miau-')
+    pieces = []
+    try:
+        for i, (line, segment_data) in enumerate(remix_data, 1):
+            key_parts = [
+                file_hash(segment_data['clip']) if hash_clips else segment_data['clip'],
+                '{:.3f}'.format(segment_data['begin']),
+                '{:.3f}'.format(segment_data['end']), output_type, extension,
+                json.dumps(params, sort_keys=True)
+            ]
+            if preview:
+                key_parts.append(line if captions else 'preview')
+            key = cache.key(*key_parts)
+            piece = cache.lookup(key, extension)
+            if piece is None:
+                logging.info('Rendering segment %s/%s', i, len(remix_data))
+                profiler.count('segment_cache_misses')
+                clip = mvp_clips[segment_data['clip']]
+                segment = remix_segment(clip, line, segment_data, output_type, preview, captions)
+                filename = os.path.join(workdir, '{}{}'.format(i, extension))
+                with profiler.stage('write', clip=segment_data['clip']):
+                    getattr(segment, method)(filename, **params)
+                piece = cache.store(key, filename, extension)
+            else:
+                profiler.count('segment_cache_hits')
+            pieces.append(piece)
+        durations = [segment_data['end'] - segment_data['begin'] for _, segment_data in remix_data]
+        with profiler.stage('concat'):
+            concat_files(pieces, output_file, '-c', 'copy', durations=durations)
+        check_duration(output_file, durations)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def stream_segments(remix_data, video_file, audio_file, output_type, mvp_clips, codec=None,
+                    audio_codec='pcm_s16le', params=None, preview=False, captions=False,
+                    start=0, fps=None, size=None):
+    """
+    write the segments of the remix one after another: frames into
+    ``video_file`` (encoded with ``codec``, only for videos) and audio
+    into ``audio_file`` (encoded with ``audio_codec``).
+
+    Frames and audio chunks are written as they are read. Only the clip
+    of the current segment is kept open: it's released from ``mvp_clips``
+    (a :class:`LazyClips`) as soon as the next segment comes from
+    another one. The frames and audio of the segments repeated in
+    ``remix_data`` (see :func:`segment_span`) are also written to
+    temporary files the first time, and read back from them for the
+    repetitions, instead of decoding them again.
+
+    :param start: time of the whole remix where ``remix_data`` begins,
+                  for chunks of a remix (see :func:`render_chunked`).
+    :param fps: frames per second. Default to ``params``' or the first clip's.
+    :param size: frame size. Default to the first frame's.
+    """
+    from moviepy.audio.io.ffmpeg_audiowriter import FFMPEG_AudioWriter
+    from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+    import numpy
+    from PIL import Image
+
+    params = params or {}
+    audio_fps, bitrate = STREAM_AUDIO_FPS, None
+    if output_type == 'audio':
+        audio_fps, bitrate = params.get('fps', STREAM_AUDIO_FPS), params.get('bitrate')
+    audio_writer = FFMPEG_AudioWriter(audio_file, audio_fps, codec=audio_codec, bitrate=bitrate)
+    video_writer = None
+    elapsed = start     # seconds of the remix written so far
+
+    def key(line, segment_data):
+        # captions make the same span look different for each verse
+        return segment_span(segment_data) + ((line,) if preview and captions else ())
+
+    counts = Counter(key(line, segment_data) for line, segment_data in remix_data)
+    # frames and samples files and duration of the repeated segments written
+    recorded = {}
+    workdir = tempfile.mkdtemp(prefix='miau-') if max(counts.values()) > 1 else None
+    try:
+        for i, (line, segment_data) in enumerate(remix_data):
+            segment_key = key(line, segment_data)
+            record = recorded.get(segment_key)
+            if record is None:
+                segment = remix_segment(mvp_clips[segment_data['clip']], line, segment_data,
+                                        output_type, preview, captions)
+                duration = segment.duration
+                if counts[segment_key] > 1:
+                    record = tuple(os.path.join(workdir, '{}.{}'.format(i, kind))
+                                   for kind in ('frames', 'samples')) + (duration,)
+                    recorders = [open(filename, 'wb') for filename in record[:2]]
+                else:
+                    recorders = None
+            else:
+                segment, recorders, duration = None, None, record[2]
+                profiler.count('segments_replayed')
+            # frames and samples are those falling in the segment in the timeline of
+            # the whole remix, as if the segments were concatenated
+            begin, elapsed = elapsed, elapsed + duration
+            samples = int(round(elapsed * audio_fps)) - int(round(begin * audio_fps))
+            with profiler.stage('write', clip=segment_data['clip']):
+                audio = segment
+                if output_type == 'video':
+                    fps = fps or params.get('fps') or segment.fps
+                    frames = range(int(math.ceil(begin * fps)), int(math.ceil(elapsed * fps)))
+                    replay = open(record[0], 'rb') if segment is None else None
+                    frame = None
+                    for n in frames:
+                        if replay is not None:
+                            # the count of frames may differ by one: repeat the last
+                            data = replay.read(size[0] * size[1] * 3)
+                            if data:
+                                frame = numpy.frombuffer(data, dtype='uint8').reshape(
+                                    size[1], size[0], 3
+                                )
+                            video_writer.write_frame(frame)
+                            continue
+                        frame = segment.get_frame(max(0, n / float(fps) - begin)).astype('uint8')
+                        size = size or (frame.shape[1], frame.shape[0])
+                        if video_writer is None:
+                            video_writer = FFMPEG_VideoWriter(
+                                video_file, size, fps, codec=codec,
+                                preset=params.get('preset', 'medium'), bitrate=params.get('bitrate')
+                            )
+                        if (frame.shape[1], frame.shape[0]) != tuple(size):
+                            frame = Image.fromarray(frame).resize(size, Image.BILINEAR)
+                            frame = numpy.asarray(frame)
+                        video_writer.write_frame(frame)
+                        if recorders:
+                            recorders[0].write(numpy.ascontiguousarray(frame).tobytes())
+                    if replay is not None:
+                        replay.close()
+                    audio = segment and segment.audio
+
+                if segment is None:
+                    with open(record[1], 'rb') as replay:
+                        chunk = numpy.frombuffer(replay.read(samples * 4), dtype='int16')
+                    if len(chunk):
+                        audio_writer.write_frames(chunk.reshape(-1, 2))
+                    samples -= len(chunk) // 2
+                elif audio is not None:
+                    for chunk in audio.iter_chunks(chunksize=STREAM_CHUNK_SIZE, fps=audio_fps,
+                                                   quantize=True, nbytes=2):
+                        if samples <= 0:
+                            break
+                        if chunk.shape[1] == 1:
+                            chunk = numpy.hstack([chunk, chunk])
+                        chunk = chunk[:samples]
+                        audio_writer.write_frames(chunk)
+                        if recorders:
+                            recorders[1].write(numpy.ascontiguousarray(chunk).tobytes())
+                        samples -= len(chunk)
+                if samples > 0:
+                    silence = numpy.zeros((samples, 2), dtype='int16')
+                    audio_writer.write_frames(silence)
+                    if recorders:
+                        recorders[1].write(silence.tobytes())
+            if recorders:
+                for recorder in recorders:
+                    recorder.close()
+                recorded[segment_key] = record
+
+            following = remix_data[i + 1][1]['clip'] if i + 1 < len(remix_data) else None
+            if following != segment_data['clip']:
+                mvp_clips.release(segment_data['clip'])
+    finally:
+        for writer in (audio_writer, video_writer):
+            if writer is not None:
+                writer.close()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def output_codecs(output_file):
+    """
+    return the codecs moviepy would use for ``output_file``: the main one
+    (video, or audio for audio files) and the audio one for videos.
+    """
+    from moviepy.tools import extensions_dict
+
+    extension = os.path.splitext(output_file)[1][1:]
+    codec = extensions_dict[extension].get('codec', ['libx264'])[0]
+    return codec, 'libvorbis' if extension in ('ogv', 'webm') else 'libmp3lame'
+
+
+def mux(video_file, audio_file, output_file, params=None):
+    """join the video of ``video_file``, as is, with the audio of ``audio_file``, encoded"""
+    params = params or {}
+    bitrate = ['-b:a', params['audio_bitrate']] if params.get('audio_bitrate') else []
+    with profiler.stage('mux'):
+        ffmpeg('-i', video_file, '-i', audio_file, '-map', '0:v:0', '-map', '1:a:0',
+               '-c:v', 'copy', '-c:a', output_codecs(output_file)[1], *(bitrate + [output_file]))
+
+
+def render_stream(remix_data, output_file, output_type, mvp_clips, params=None, preview=False,
+                  captions=False):
+    """
+    render the remix writing its segments one after another into a
+    single encoder process (see :func:`stream_segments`), so memory
+    doesn't grow with the number of segments.
+
+    Videos and their audio are encoded to separate files and muxed at
+    the end, without re-encoding the video.
+
+    :param params: moviepy's ``write_videofile`` or ``write_audiofile``
+                   arguments honored: ``fps``, ``preset``, ``bitrate``
+                   and ``audio_bitrate``.
+    """
+    codec, _ = output_codecs(output_file)
+    if output_type == 'audio':
+        return stream_segments(remix_data, None, output_file, output_type, mvp_clips,
+                               audio_codec=codec, params=params, preview=preview, captions=captions)
+    workdir = tempfile.mkdtemp(prefix='miau-')
+    try:
+        video_file = os.path.join(workdir, 'video{}'.format(os.path.splitext(output_file)[1]))
+        audio_file = os.path.join(workdir, 'audio.wav')
+        stream_segments(remix_data, video_file, audio_file, output_type, mvp_clips, codec=codec,
+                        params=params, preview=preview, captions=captions)
+        mux(video_file, audio_file, output_file, params)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def decode_pcm(clip, cache=None, dir=None):
+    """
+    return a raw file with the audio of ``clip`` decoded as interleaved
+    stereo float32 samples at ``PCM_RATE``, to map with ``numpy.memmap``.
+    It's decoded once and kept in ``cache`` (a :class:`DiskCache`) keyed by
+    the content of the clip or, if there is no cache or it doesn't fit in
+    it, left in ``dir``.
+    """
+    if cache is not None:
+        key = cache.key(file_hash(clip), 'f32le', PCM_RATE)
+        filename = cache.lookup(key, '.f32')
+        if filename is not None:
+            profiler.count('pcm_cache_hits')
+            return filename
+    logging.info('Decoding audio of %s', clip)
+    fd, filename = tempfile.mkstemp(suffix='.f32', dir=dir)
+    os.close(fd)
+    with profiler.stage('decode_pcm', clip=clip):
+        ffmpeg('-i', clip, '-vn', '-ac', 2, '-ar', PCM_RATE, '-f', 'f32le', filename)
+    if cache is not None:
+        filename = cache.store(key, filename, '.f32')
+    return filename
+
+
+def crossfade_segments(segments, overlap=0):
+    """
+    join ``segments`` (arrays of stereo samples) in a new array. If an
+    ``overlap`` is given, each one fades into the next one along that many
+    samples (at most half of any of both).
+    """
+    import numpy
+
+    if not overlap or len(segments) < 2:
+        return numpy.concatenate(segments)
+    overlaps = [0] + [min(overlap, len(a) // 2, len(b) // 2)
+                      for a, b in zip(segments, segments[1:])]
+    remix = numpy.empty((sum(map(len, segments)) - sum(overlaps), 2), dtype='float32')
+    start = 0
+    for segment, n in zip(segments, overlaps):
+        start -= n
+        if n:
+            ramp = numpy.linspace(0, 1, n, dtype='float32')[:, None]
+            remix[start:start + n] *= 1 - ramp
+            remix[start:start + n] += segment[:n] * ramp
+        remix[start + n:start + len(segment)] = segment[n:]
+        start += len(segment)
+    return remix
+
+
+def render_pcm(remix_data, output_file, cache=None, crossfade=0, probe_cache=None):
+    """
+    render an audio remix with numpy. The audio of each clip is decoded
+    once (see :func:`decode_pcm`) and memory mapped, so verses are slices
+    of it read from disk only when they are joined, in a single
+    concatenation (crossfading ``crossfade`` seconds at each cut, if
+    given). The result is encoded by one ffmpeg call.
+
+    :param cache: optional :class:`DiskCache` for the decoded audio.
+    :param probe_cache: optional :class:`DiskCache` for :func:`probe`
+    """
+    import numpy
+
+    clips = list(OrderedDict.fromkeys(data['clip'] for _, data in remix_data))
+    for clip in clips:
+        if not probe(clip, cache=probe_cache)['audio']:
+            raise ValueError('No audio in {}'.format(clip))
+    workdir = tempfile.mkdtemp(prefix='miau-')
+    try:
+        sources = {}
+        for clip in clips:
+            filename = decode_pcm(clip, cache=cache, dir=workdir)
+            if not os.path.getsize(filename):
+                raise ValueError('No audio in {}'.format(clip))
+            sources[clip] = numpy.memmap(filename, dtype='<f4', mode='r').reshape(-1, 2)
+        segments = [
+            sources[data['clip']][int(round(data['begin'] * PCM_RATE)):
+                                  int(round(data['end'] * PCM_RATE))]
+            for _, data in remix_data
+        ]
+        with profiler.stage('concat'):
+            remix = crossfade_segments(segments, int(round(crossfade * PCM_RATE)))
+        command = [ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y',
+                   '-f', 'f32le', '-ar', str(PCM_RATE), '-ac', '2', '-i', '-',
+                   '-c:a', output_codecs(output_file)[0], output_file]
+        with profiler.stage('write'):
+            proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+            proc.stdin.write(remix.data)
+            proc.stdin.close()
+            if proc.wait():
+                raise subprocess.CalledProcessError(proc.returncode, command)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def split_chunks(remix_data, chunks):
+    """
+    split ``remix_data`` in up to ``chunks`` contiguous pieces so the
+    longest one is as short as possible: the limit is found by bisection
+    and the pieces are filled greedily up to it, using the prefix sums of
+    the durations. Return a list of ``(start, piece)``, where ``start``
+    is the time of the remix where the piece begins.
+
+    >>> durations = [1, 1, 1, 10, 1, 1]
+    >>> [[data['end'] - data['begin'] for _, data in piece] for _, piece in split_chunks(
+    ...     [('', {'begin': 0, 'end': d}) for d in durations], 3)]
+    [[1, 1, 1], [10], [1, 1]]
+    """
+    if not remix_data:
+        return []
+    durations = [data['end'] - data['begin'] for _, data in remix_data]
+    starts = list(accumulate(durations, initial=0))
+
+    def bounds(limit):
+        # where each piece begins, none longer than limit unless a single verse is
+        result = [0]
+        while result[-1] < len(durations):
+            end = bisect_right(starts, starts[result[-1]] + limit) - 1
+            result.append(max(end, result[-1] + 1))
+        return result
+
+    low, high = max(durations), starts[-1]
+    for _ in range(50):
+        middle = (low + high) / 2
+        if len(bounds(middle)) - 1 <= chunks:
+            high = middle
+        else:
+            low = middle
+    cuts = bounds(high)
+    return [(starts[a], remix_data[a:b]) for a, b in zip(cuts, cuts[1:])]
+
+
+def _stream_task(task, **kwargs):
+    remix_data, video_file, audio_file, output_type = task[:4]
+    mvp_clips = LazyClips(output_type)
+    try:
+        stream_segments(remix_data, video_file, audio_file, output_type, mvp_clips, **kwargs)
+    finally:
+        mvp_clips.close()
+
+
+def render_chunked(remix_data, output_file, output_type, mvp_clips, chunks, params=None,
+                   preview=False, captions=False):
+    """
+    split the remix in ``chunks`` contiguous pieces (see :func:`split_chunks`)
+    written by :func:`stream_segments` in a pool of processes, and join them
+    without re-encoding the video.
+
+    Every chunk takes its frames from the timeline of the whole remix,
+    with the same codec settings, frame rate and size, so the result has
+    the same frames than :func:`render_stream`'s. The audio of the chunks
+    is joined as pcm and encoded once.
+    """
+    codec, _ = output_codecs(output_file)
+    fps = size = None
+    if output_type == 'video':
+        # the frame rate and size of the output are those of its first frame
+        line, data = remix_data[0]
+        first = remix_segment(mvp_clips[data['clip']], line, data, output_type, preview, captions)
+        fps = (params or {}).get('fps') or first.fps
+        frame = first.get_frame(0)
+        size = frame.shape[1], frame.shape[0]
+        mvp_clips.release(data['clip'])
+
+    extension = os.path.splitext(output_file)[1]
+    workdir = tempfile.mkdtemp(prefix='miau-')
+    try:
+        tasks = []
+        pieces = split_chunks(remix_data, chunks)
+        for i, (start, piece) in enumerate(pieces):
+            video_file = os.path.join(workdir, '{:05d}{}'.format(i, extension))
+            audio_file = os.path.join(workdir, '{:05d}.wav'.format(i))
+            tasks.append((piece, video_file, audio_file, output_type))
+        logging.info('Rendering %s segments in %s chunks', len(remix_data), len(pieces))
+        with ProcessPoolExecutor(max_workers=len(pieces)) as executor:
+            futures = [
+                executor.submit(_profiled, _stream_task, task, codec=codec, params=params,
+                                preview=preview, captions=captions, start=start, fps=fps,
+                                size=size)
+                for task, (start, _) in zip(tasks, pieces)
+            ]
+            for future in futures:
+                _, records = future.result()
+                profiler.merge(records)
+
+        audio_file = os.path.join(workdir, 'audio.wav')
+        with profiler.stage('concat'):
+            concat_files([task[2] for task in tasks], audio_file, '-c', 'copy')
+            if output_type == 'video':
+                video_file = os.path.join(workdir, 'video{}'.format(extension))
+                concat_files([task[1] for task in tasks], video_file, '-c', 'copy')
+        if output_type == 'video':
+            return mux(video_file, audio_file, output_file, params)
+        bitrate = ['-b:a', params['bitrate']] if params and params.get('bitrate') else []
+        with profiler.stage('write'):
+            ffmpeg('-i', audio_file, '-c:a', codec, *(bitrate + [output_file]))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+class WordIndex(object):
+    """
+    Index of the words of a transcript, to resolve any sequence of
+    them to a time span after a single word level alignment.
+
+    >>> index = WordIndex('I have a dream that one day'.split())
+    >>> index.find('a dream that')
+    2
+    >>> index.align({'fragments': [{'begin': '0.0', 'end': '0.2'}, ...]})
+    >>> index.span('a dream that')
+    (0.5, 1.4)
+    """
+
+    def __init__(self, words):
+        self.words = words
+        self.times = None
+        self.positions = defaultdict(list)
+        for i, word in enumerate(words):
+            self.positions[word].append(i)
+
+    def source(self):
+        """text to align: one word per line"""
+        return '\n'.join(self.words)
+
+    def find(self, line):
+        """return the position of the first occurrence of ``line`` or ``None``"""
+        tokens = line.split()
+        if not tokens:
+            return None
+        n = len(tokens)
+        for i in self.positions.get(tokens[0], ()):
+            if self.words[i:i + n] == tokens:
+                return i
+        return None
+
+    def align(self, output):
+        """load word timings from aeneas' output of :meth:`source`"""
+        self.times = [(float(f['begin']), float(f['end'])) for f in output['fragments']]
+
+    def span(self, line):
+        """return (begin, end) of ``line`` in seconds or ``None`` if not found"""
+        i = self.find(line)
+        if i is None:
+            return None
+        return self.times[i][0], self.times[i + len(line.split()) - 1][1]
+
+
+def preview_frame(frame, height, caption=None):
+    """
+    downscale ``frame`` to ``height`` (if taller) and draw ``caption``
+    over a black band at its bottom
+    """
+    import numpy
+    from PIL import Image, ImageDraw
+
+    image = Image.fromarray(frame)
+    if image.height > height:
+        # keep an even width, as needed by most encoders
+        width = int(image.width * height / image.height) // 2 * 2
+        image = image.resize((width, height), Image.BILINEAR)
+    if caption:
+        draw = ImageDraw.Draw(image)
+        top = image.height - 20
+        draw.rectangle([0, top, image.width, image.height], fill=(0, 0, 0))
+        draw.text((6, top + 4), caption, fill=(255, 255, 255))
+    return numpy.asarray(image)
+
+
+def remix_segment(clip, line, segment_data, output_type, preview=False, captions=False):
+    """
+    return the moviepy subclip of a remix verse. For previews of videos,
+    it's downscaled to ``PREVIEW_HEIGHT`` and, if ``captions`` is ``True``,
+    the verse and its timing are burned into it.
+    """
+    profiler.count('segments')
+    with profiler.stage('subclip', clip=segment_data['clip']):
+        segment = clip.subclip(segment_data['begin'], segment_data['end'])
+    if preview and output_type == 'video':
+        caption = None
+        if captions:
+            caption = u'{}  [{} {:.2f}-{:.2f}]'.format(
+                line, os.path.basename(segment_data['clip']),
+                segment_data['begin'], segment_data['end']
+            )
+        segment = segment.fl_image(lambda frame: preview_frame(frame, PREVIEW_HEIGHT, caption))
+    return segment
+
+
+def make_remix(remix_data, mvp_clips, output_type, preview=False, captions=False):
     """
     Return the moviepy clip resulting of concatenate each
     segment listed in the remix data
@@ -140,179 +1163,2255 @@ def make_remix(remix_data, mvp_clips, output_type):
 
         [('line on remix': {'begin': start, 'end': end, 'clip': file}), ...]
 
-    :param mvp_clips: dictionary of filename: {moviepy's clip}
+    :param mvp_clips: dictionary of filename: {moviepy's clip}, like :class:`LazyClips`
     :param output_type: ``'audio'`` or ``'video'``
+    :param preview: build a draft quality clip (see :func:`remix_segment`)
+    :param captions: burn each verse in the preview
     """
+    from moviepy.editor import concatenate_videoclips, concatenate_audioclips
+
     concatenate = (
         concatenate_videoclips if output_type == 'video' else concatenate_audioclips
     )
-    segments = []
-    for _, segment_data in remix_data:
-        clip = mvp_clips[segment_data['clip']]
-        segment = clip.subclip(segment_data['begin'], segment_data['end'])
-        segments.append(segment)
+    with profiler.stage('make_remix'):
+        segments = []
+        # subclips of the spans cut so far, reused by their repetitions
+        cut = {}
+        for line, segment_data in remix_data:
+            key = segment_span(segment_data) + ((line,) if preview and captions else ())
+            if key not in cut:
+                clip = mvp_clips[segment_data['clip']]
+                cut[key] = remix_segment(clip, line, segment_data, output_type, preview, captions)
+            segments.append(cut[key])
+
+        return concatenate(segments)
 
-    return concatenate(segments)
 
+def media_duration(filename, cache=None):
+    """return the duration in seconds of an audio/video file"""
+    return probe(filename, cache=cache)['duration']
 
-def get_fragments_database(mvp_clips, transcripts, remix, debug=False, force_language=None):
+
+def extract_audio(clip, start=0, duration=None, dir=None):
     """
-    generate a dictionary containing segment information for every
-    line produced by :func:`fragmenter`
+    write ``duration`` seconds (or up to the end) of the audio of
+    ``clip`` from ``start`` as a mono 16kHz wav file in ``dir``.
+    Return its filename.
+    """
+    fd, filename = tempfile.mkstemp(suffix='.wav', dir=dir)
+    os.close(fd)
+    span = ['-ss', '{:.3f}'.format(start)]
+    if duration is not None:
+        span += ['-t', '{:.3f}'.format(duration)]
+    subprocess.check_call([ffmpeg_binary(), '-loglevel', 'error', '-y'] + span + [
+        '-i', clip, '-vn', '-ac', '1', '-ar', '16000', filename
+    ])
+    return filename
 
-    :parameter clips: list of input clip filenames
-    :parameter transcripts: raw texts of transcripts. map one-one to clips
-    :remix: list of remix lines dictionaries as returned by :func:`fine_tuning`
 
+def aligner_audio(clip, cache=None, dir=None):
     """
-    sources_by_clip = OrderedDict()
-    remix_lines = list(remix.keys())
+    return a mono 16kHz wav with the whole audio of ``clip``, the
+    input given to aeneas. It's extracted once and kept in ``cache``
+    (a :class:`DiskCache`) keyed by the content of the clip or, if
+    there is no cache, left in ``dir``.
+    """
+    if cache is not None:
+        key = cache.key(file_hash(clip), 'mono16k')
+        audio = cache.lookup(key, '.wav')
+        if audio is not None:
+            profiler.count('audio_cache_hits')
+            return audio
+    logging.info('Extracting audio of %s', clip)
+    with profiler.stage('extract_audio', clip=clip):
+        audio = extract_audio(clip, dir=dir)
+    if cache is not None:
+        audio = cache.store(key, audio, '.wav')
+    return audio
 
-    #
-    for clip, transcript in zip(mvp_clips, transcripts):
-        transcript = open(transcript).read().replace('\n', ' ').replace('  ', ' ')
-        sources_by_clip[clip], remix_lines = fragmenter(transcript, remix_lines, debug=debug)
-        if not remix_lines:
-            break
-    else:
-        if remix_lines:
-            raise ValueError(
-                "Remix verse/s not found in transcripts given:\n{}".format('\n- '.join(remix_lines))
-        )
 
-    # create Task object
+def alignment_key(clip, source, language, window=None):
+    """key of the alignment of a task in the cache (see :func:`align`)"""
+    key_parts = [file_hash(clip), source, language]
+    if window is not None:
+        key_parts.append(window)
+    return DiskCache.key(*key_parts)
 
-    fragments = OrderedDict()
-    for clip, sources in sources_by_clip.items():
-        l_sources = len(sources)
-        for i, source in enumerate(sources, 1):
-            if force_language:
-                language = force_language
-            elif i == 1:
-                # for first iteration of the clip, autodetect the language
-                snippet = source[:source.index(' ', 100)]
-                language = langdetect.detect(snippet)
-                logging.info("Autodetected language for %s: %s", clip, language)
-
-            config_string = u"task_language={}|is_text_type=plain|os_task_file_format=json".format(language)
-            with tempfile.NamedTemporaryFile('w', delete=False) as f_in:
-                f_in.write(source)
-            output_json = '{}.json'.format(f_in.name)
-            logging.info('Forcing aligment for %s (step %s/%s)', clip, i, l_sources)
+
+def align(clip, source, language, window=None, cache=None, audio=None):
+    """
+    force the alignment of the text ``source`` against the audio of
+    ``clip``, returning aeneas' output as a dictionary.
+
+    If ``window`` is a ``(begin, end)`` pair of seconds, only that
+    excerpt of the audio is aligned. Times in the output are
+    relative to the whole clip anyway.
+
+    If a :class:`DiskCache` is given, a previous result for the same
+    clip content, text and language is reused and aeneas is skipped.
+
+    :param audio: the audio of ``clip`` already extracted (see
+                  :func:`aligner_audio`), to read instead of the clip.
+    """
+    if cache is not None:
+        key = alignment_key(clip, source, language, window)
+        output = cache.load_json(key)
+        if output is not None:
+            logging.info('Using cached aligment for %s', clip)
+            profiler.count('alignment_cache_hits')
+            return output
+        profiler.count('alignment_cache_misses')
+
+    from aeneas.tools.execute_task import ExecuteTaskCLI
+
+    config_string = u"task_language={}|is_text_type=plain|os_task_file_format=json".format(language)
+    with tempfile.NamedTemporaryFile('w', delete=False) as f_in:
+        f_in.write(source)
+    output_json = '{}.json'.format(f_in.name)
+    excerpt = None
+    if window is not None:
+        with profiler.stage('extract_audio', clip=clip):
+            excerpt = extract_audio(audio or clip, window[0], window[1] - window[0])
+    try:
+        with profiler.stage('aeneas', clip=clip):
             ExecuteTaskCLI(use_sys=False).run(arguments=[
                 None,
-                os.path.abspath(clip),
+                excerpt or os.path.abspath(audio or clip),
                 f_in.name,
                 config_string,
                 output_json
             ])
-            output = json.load(open(output_json))
-            for f in output['fragments']:
-                line = f['lines'][0]
-                try:
-                    offset_begin = remix[line]['offset_begin']
-                    offset_end = remix[line]['offset_end']
-                except KeyError:
-                    offset_begin = 0
-                    offset_end = 0
-
-                fragments[line] = {
-                    'begin': float(f['begin']) + offset_begin,
-                    'end': float(f['end']) + offset_end,
-                    'clip': clip
-                }
-        if debug:
-            d = tempfile.mkstemp(suffix='.json')[1]
-            json.dump(fragments, open(d, 'w'), indent=2)
-            logging.debug('Segments database written to {}'.format(d))
-        return fragments
+        with open(output_json) as f_out:
+            output = json.load(f_out)
+    finally:
+        for filename in (f_in.name, output_json, excerpt):
+            if filename and os.path.exists(filename):
+                os.remove(filename)
 
+    if window is not None:
+        for f in output['fragments']:
+            f['begin'] = '{:.3f}'.format(float(f['begin']) + window[0])
+            f['end'] = '{:.3f}'.format(float(f['end']) + window[0])
 
-def ensure_audio(clip):
-    if isinstance(clip, AudioFileClip):
-        return clip
-    elif isinstance(clip, VideoFileClip):
-        return clip.audio
+    if cache is not None:
+        cache.dump_json(key, output)
+    return output
 
 
-def miau(clips, transcripts, remix, output_file=None, dump=None, debug=False,
-         force_language=None):
-    """Main miau entrypoint
+def _align_task(task, step=None, audio=None, cache=None):
+    with profiler.stage('alignment', clip=task[0], step=step):
+        return align(*task, cache=cache, audio=audio)
 
-    :param clips: list of audio/video files (as supported by moviepy).
-    :param transcripts: list of transcriptions filenames, in the
-                        same order of ``clips``.
-    :param remix: remix filename. Could be a raw text or a json file as
-                  generated by ``dump`` option. If it's a json, forced
-                  aligment is skipped.
-    :param output_file: filename of the generated audio/video file. Format
-                        is inferred from the extension.
-    :param dump: if ``True``, generate a json file that can replace the
-                 text based remix, useful for a manual tuning.
-    :param debug: verbose output if ``True``.
-    :param forced_language: By default language is inferred from a portion
-                            of each transcript. If a 2-letter language code
-                            is passed, it overrides that.
+
+def align_many(tasks, cache=None, jobs=1, audio_cache=None):
     """
-    if not output_file:
-        # default to a video with the same filename than the remix
-        output_file = '{}.mp4'.format(os.path.basename(remix).rsplit('.')[0])
-    output_extension = os.path.splitext(output_file)[1][1:]
-    if output_extension not in extensions_dict:
-        raise ValueError(
-            'Output format not supported: {}'.format(output_extension)
-        )
-    output_type = extensions_dict[output_extension]['type']
+    run :func:`align` for each ``(clip, source, language[, window])`` task.
 
-    # map input files to moviepy clips
-    mvp_clips = OrderedDict()
-    for filename in clips:
-        try:
-            clip = VideoFileClip(filename)
-        except KeyError:
-            clip = AudioFileClip(filename)
-        mvp_clips[filename] = clip
+    The audio of each clip is extracted once (see :func:`aligner_audio`)
+    and shared by all its passes, and only if some of them
+    isn't in ``cache`` yet.
 
-    if output_type == 'video' and not all(isinstance(clip, VideoFileClip) for clip in mvp_clips.values()):
-        logging.error("Output expect to be a video but input clips aren't all videos")
-        return
-    elif output_type == 'audio':
-        # cast clips to audio if needed
-        mvp_clips = OrderedDict([(k, ensure_audio(v)) for k, v in mvp_clips.items()])
+    With ``jobs > 1`` the alignments are distributed in a pool of
+    processes. Outputs are returned in the same order of ``tasks``
+    so the result is identical to a serial run.
 
-    with open(remix) as remix_fh:
-        try:
+    :param audio_cache: optional :class:`DiskCache` for the extracted audio
+    """
+    # number each pass of a clip for the profile
+    passes = Counter()
+    steps = []
+    for task in tasks:
+        passes[task[0]] += 1
+        steps.append(passes[task[0]])
+
+    workdir = tempfile.mkdtemp(prefix='miau-')
+    try:
+        audios = {}
+        for task in tasks:
+            clip = task[0]
+            if clip in audios or (
+                    cache is not None and cache.lookup(alignment_key(*task), '.json')):
+                continue
+            audios[clip] = aligner_audio(clip, cache=audio_cache, dir=workdir)
+        clip_audios = [audios.get(task[0]) for task in tasks]
+
+        if jobs > 1 and len(tasks) > 1:
+            outputs = []
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                for output, records in executor.map(
+                        partial(_profiled, _align_task, cache=cache), tasks, steps, clip_audios):
+                    profiler.merge(records)
+                    outputs.append(output)
+            return outputs
+        return [
+            _align_task(task, step, audio, cache=cache)
+            for task, step, audio in zip(tasks, steps, clip_audios)
+        ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def ffmpeg_binary():
+    """the ffmpeg executable moviepy is configured to use"""
+    from moviepy.config import get_setting
+
+    return get_setting('FFMPEG_BINARY')
+
+
+def ffmpeg(*args):
+    """run ffmpeg with the given arguments, quietly"""
+    command = [ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y']
+    subprocess.check_call(command + [str(arg) for arg in args])
+
+
+def probe_streams(filename):
+    """
+    return the duration, and the codec and main parameters of the
+    first video and audio streams of ``filename`` (``None`` if missing),
+    as reported by ``ffmpeg -i``.
+    """
+    proc = subprocess.Popen(
+        [ffmpeg_binary(), '-hide_banner', '-i', filename],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    _, infos = proc.communicate()
+    streams = {'duration': None, 'video': None, 'audio': None}
+    duration = DURATION_PATTERN.search(infos)
+    if duration:
+        hours, minutes, seconds = duration.groups()
+        streams['duration'] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    for match in STREAM_PATTERN.finditer(infos):
+        kind = match.group('type').lower()
+        if streams[kind] is not None:
+            continue
+        info = match.group('info')
+        stream = {'codec': match.group('codec')}
+        if kind == 'video':
+            size = re.search(r', (\d+)x(\d+)', info)
+            fps = re.search(r'([\d.]+) fps', info)
+            pix_fmt = re.search(r', (yuv\w+|rgb\w+|gray\w*|nv\w+)', info)
+            stream['size'] = [int(size.group(1)), int(size.group(2))] if size else None
+            stream['fps'] = float(fps.group(1)) if fps else None
+            stream['pix_fmt'] = pix_fmt.group(1) if pix_fmt else None
+        else:
+            rate = re.search(r'(\d+) Hz', info)
+            stream['rate'] = int(rate.group(1)) if rate else None
+            stream['channels'] = 1 if ' mono' in info else 2
+        streams[kind] = stream
+    return streams
+
+
+_probes = {}
+
+
+def probe(filename, cache=None):
+    """
+    as :func:`probe_streams`, memoized for the run and, if a
+    :class:`DiskCache` is given, between runs. Entries are keyed by
+    path, size and modification time, so nothing is read from a
+    clip already probed.
+    """
+    stat = os.stat(filename)
+    key = DiskCache.key(os.path.abspath(filename), stat.st_size, stat.st_mtime)
+    if key not in _probes:
+        info = cache.load_json(key) if cache is not None else None
+        if info is None:
+            info = probe_streams(filename)
+            if cache is not None:
+                cache.dump_json(key, info)
+        _probes[key] = info
+    return _probes[key]
+
+
+class LazyClips(object):
+    """
+    a mapping of filenames to moviepy clips, opening each one
+    the first time it's needed.
+
+    If ``output_type`` is ``'audio'``, only the audio of each file is
+    read.
+    """
+
+    def __init__(self, output_type):
+        self.output_type = output_type
+        self.opened = OrderedDict()
+
+    def __getitem__(self, filename):
+        if filename not in self.opened:
+            from moviepy.editor import VideoFileClip, AudioFileClip
+
+            logging.debug('Opening %s', filename)
+            profiler.count('clips_opened')
+            with profiler.stage('open_clip', clip=filename):
+                if self.output_type == 'audio':
+                    self.opened[filename] = AudioFileClip(filename)
+                else:
+                    self.opened[filename] = VideoFileClip(filename)
+        return self.opened[filename]
+
+    def release(self, filename):
+        """close the readers of ``filename``, if opened"""
+        clip = self.opened.pop(filename, None)
+        if clip is not None:
+            clip.close()
+
+    def close(self):
+        for filename in list(self.opened):
+            self.release(filename)
+
+
+def keyframes(filename):
+    """return the times of the keyframes of the video of ``filename``"""
+    proc = subprocess.Popen(
+        [ffmpeg_binary(), '-hide_banner', '-skip_frame', 'nokey', '-i', filename,
+         '-map', '0:v:0', '-vf', 'showinfo', '-f', 'null', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    _, infos = proc.communicate()
+    return [float(t) for t in re.findall(r'pts_time:([\d.]+)', infos)]
+
+
+def concat_files(pieces, output_file, *args, durations=None):
+    """
+    join ``pieces`` with ffmpeg's concat demuxer into ``output_file``.
+
+    If the ``durations`` of the pieces are given, each one is cut there
+    and the next one starts right after it, so the padding encoders add
+    to audio streams doesn't leave gaps at the joins.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as listing:
+        for i, piece in enumerate(pieces):
+            listing.write("file '{}'\n".format(os.path.abspath(piece).replace("'", "'\\''")))
+            if durations:
+                listing.write('duration {0:.6f}\noutpoint {0:.6f}\n'.format(durations[i]))
+    try:
+        ffmpeg('-f', 'concat', '-safe', '0', '-i', listing.name, *(args + (output_file,)))
+    finally:
+        os.remove(listing.name)
+
+
+def check_duration(output_file, durations):
+    """
+    warn if the duration of ``output_file`` isn't the sum of the
+    ``durations`` of its segments (up to ``DURATION_TOLERANCE``).
+    Return the difference, in seconds.
+    """
+    difference = media_duration(output_file) - sum(durations)
+    if abs(difference) > DURATION_TOLERANCE:
+        logging.warning('%s lasts %.3fs more than its segments', output_file, difference)
+    return difference
+
+
+def cut_segment(clip, begin, end, streams, clip_keyframes, prefix):
+    """
+    cut the video of ``clip`` between ``begin`` and ``end`` seconds into
+    matroska pieces, copying the stream between the first and the last
+    keyframe inside the segment and re-encoding only the borders. Cuts
+    fall on whole frames and the timestamps of every piece start at 0
+    (not shifted to avoid negative ones), so they join without gaps.
+    The audio is cut apart (see :func:`cut_audio`).
+
+    Return the list of pieces' filenames and durations.
+    """
+    video = streams['video']
+    encode = ['-c:v', VIDEO_ENCODERS[video['codec']], '-crf', '18']
+    if video['codec'] in ('h264', 'hevc'):
+        encode += ['-preset', 'veryfast']
+    else:
+        encode += ['-b:v', '0', '-deadline', 'realtime']
+    if video['pix_fmt']:
+        encode += ['-pix_fmt', video['pix_fmt']]
+    if video['fps']:
+        encode += ['-r', video['fps']]
+
+    copy = ['-c', 'copy']
+    fps = float(video['fps'] or 0)
+    if fps:
+        # work in whole frames, so every piece ends where the next one begins
+        # and a closed GOP is copied whole: cut by frame count, not by time
+        first = int(round(begin * fps))
+        last = first + int(round((end - begin) * fps))
+        inner = [int(round(k * fps)) for k in clip_keyframes if first <= round(k * fps) <= last]
+    else:
+        first, last = begin, end
+        inner = [k for k in clip_keyframes if begin <= k <= end]
+    if len(inner) < 2:
+        spans = [(first, last, encode)]
+    else:
+        spans = [
+            (first, inner[0], encode),
+            (inner[0], inner[-1], copy),
+            (inner[-1], last, encode)
+        ]
+    pieces = []
+    for i, (start, stop, codec) in enumerate(spans):
+        if fps:
+            if stop <= start:
+                continue
+            codec = codec + ['-frames:v', stop - start]
+            start, stop = start / fps, stop / fps
+        elif stop - start < 0.001:
+            continue
+        piece = '{}-{}.mkv'.format(prefix, i)
+        ffmpeg('-ss', '{:.6f}'.format(start), '-i', clip, '-t', '{:.6f}'.format(stop - start),
+               '-map', '0:v:0', '-an', *(codec + ['-f', 'matroska', piece]))
+        pieces.append((piece, stop - start))
+    return pieces
+
+
+def cut_audio(clip, begin, duration, piece, rate=44100, channels=2):
+    """
+    decode ``duration`` seconds of the audio of ``clip`` from ``begin``
+    to the wav file ``piece``. Uncompressed pieces join sample exact.
+    """
+    ffmpeg('-ss', '{:.6f}'.format(begin), '-i', clip, '-t', '{:.6f}'.format(duration),
+           '-vn', '-c:a', 'pcm_s16le', '-ar', rate, '-ac', channels, piece)
+
+
+def segment_span(segment_data):
+    """the clip, begin and end of a segment, to the millisecond"""
+    return (segment_data['clip'], round(segment_data['begin'], 3), round(segment_data['end'], 3))
+
+
+def dedupe_segments(remix_data):
+    """
+    return an ordered dictionary of each distinct span of ``remix_data``
+    (see :func:`segment_span`) and the positions of the verses cut from it,
+    so each one can be rendered once. Log the segment-seconds saved.
+    """
+    spans = OrderedDict()
+    for i, (_, segment_data) in enumerate(remix_data):
+        spans.setdefault(segment_span(segment_data), []).append(i)
+    repeated = len(remix_data) - len(spans)
+    if repeated:
+        saved = sum((len(positions) - 1) * (end - begin)
+                    for (_, begin, end), positions in spans.items())
+        profiler.count('segments_deduplicated', repeated)
+        profiler.count('seconds_deduplicated', round(saved, 3))
+        logging.info('%s repeated segments rendered once: %.2f segment-seconds saved',
+                     repeated, saved)
+    return spans
+
+
+def render_ffmpeg(remix_data, output_file, output_type, cache=None):
+    """
+    render the remix calling ffmpeg directly, without decoding
+    frames in python.
+
+    Videos are cut with :func:`cut_segment` and joined without
+    re-encoding. Their audio is joined uncompressed and encoded once,
+    with the codec of the clips. Raise ``ValueError`` if the inputs can't be joined
+    that way (different or unsupported codecs, sizes or frame rates).
+
+    :param cache: optional :class:`DiskCache` for :func:`probe`
+    """
+    clips = list(OrderedDict.fromkeys(data['clip'] for _, data in remix_data))
+    # pieces of each span, cut once however many times it's repeated
+    cut = {}
+    workdir = tempfile.mkdtemp(prefix='miau-')
+    try:
+        if output_type == 'audio':
+            pieces = []
+            for i, (_, data) in enumerate(remix_data):
+                span = segment_span(data)
+                if span not in cut:
+                    piece = os.path.join(workdir, '{:05d}.wav'.format(i))
+                    cut_audio(data['clip'], data['begin'], data['end'] - data['begin'], piece)
+                    cut[span] = [(piece, data['end'] - data['begin'])]
+                pieces.extend(cut[span])
+            concat_files([piece for piece, _ in pieces], output_file,
+                         durations=[duration for _, duration in pieces])
+            check_duration(output_file, [duration for _, duration in pieces])
+            return
+
+        streams = {clip: probe(clip, cache=cache) for clip in clips}
+        signatures = set()
+        for clip, clip_streams in streams.items():
+            video, audio = clip_streams['video'], clip_streams['audio']
+            if not video or video['codec'] not in VIDEO_ENCODERS:
+                raise ValueError('Unsupported video stream in {}'.format(clip))
+            if audio and audio['codec'] not in AUDIO_ENCODERS:
+                raise ValueError('Unsupported audio stream in {}'.format(clip))
+            signatures.add(json.dumps([video, audio and sorted(audio.items())], sort_keys=True))
+        if len(signatures) > 1:
+            raise ValueError('Input clips have different codecs or parameters')
+
+        clip_keyframes = {}
+        for clip in clips:
+            with profiler.stage('keyframes', clip=clip):
+                clip_keyframes[clip] = keyframes(clip)
+        audio = streams[clips[0]]['audio']
+        pieces, sounds = [], []
+        for i, (_, data) in enumerate(remix_data):
+            clip, span = data['clip'], segment_span(data)
+            if span not in cut:
+                logging.info('Cutting segment %s/%s', i + 1, len(remix_data))
+                profiler.count('segments')
+                prefix = os.path.join(workdir, '{:05d}'.format(i))
+                with profiler.stage('cut_segment', clip=clip):
+                    video_pieces = cut_segment(clip, data['begin'], data['end'], streams[clip],
+                                               clip_keyframes[clip], prefix)
+                    # as long as the video, whole frames, to keep them in sync
+                    duration = sum(duration for _, duration in video_pieces)
+                    if audio:
+                        cut_audio(clip, data['begin'], duration, prefix + '.wav',
+                                  audio['rate'], audio['channels'])
+                cut[span] = video_pieces, (prefix + '.wav', duration)
+            pieces.extend(cut[span][0])
+            sounds.append(cut[span][1])
+        video_file = os.path.join(workdir, 'video.mkv')
+        with profiler.stage('concat'):
+            concat_files([piece for piece, _ in pieces], video_file, '-c', 'copy',
+                         durations=[duration for _, duration in pieces])
+            if audio:
+                audio_file = os.path.join(workdir, 'audio.wav')
+                concat_files([sound for sound, _ in sounds], audio_file,
+                             durations=[duration for _, duration in sounds])
+                ffmpeg('-i', video_file, '-i', audio_file, '-map', '0:v:0', '-map', '1:a:0',
+                       '-c:v', 'copy', '-c:a', AUDIO_ENCODERS[audio['codec']], output_file)
+            else:
+                ffmpeg('-i', video_file, '-c', 'copy', output_file)
+        check_duration(output_file, [duration for _, duration in sounds])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def detect_language(clip, text, force_language=None):
+    if force_language:
+        return force_language
+    import langdetect
+
+    # autodetect the language from the beginning of the transcript
+    try:
+        snippet = text[:text.index(' ', 100)]
+    except ValueError:
+        snippet = text
+    with profiler.stage('langdetect', clip=clip):
+        language = langdetect.detect(snippet)
+    logging.info("Autodetected language for %s: %s", clip, language)
+    return language
+
+
+def is_subtitle(transcript):
+    return os.path.splitext(transcript)[1].lower() in SUBTITLE_EXTENSIONS
+
+
+def is_playlist(output_file):
+    return os.path.splitext(output_file)[1].lower() in PLAYLIST_EXTENSIONS
+
+
+def _timestamp(text):
+    hours, minutes, seconds, fraction = TIMESTAMP_PATTERN.match(text.strip()).groups()
+    return (int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) +
+            int(fraction) / 10.0 ** len(fraction))
+
+
+def read_cues(transcript):
+    """
+    return the cues of a SRT or WebVTT file as a list of
+    ``(begin, end, text)``, with the text in a single line
+    and without markup.
+    """
+    with open(transcript, encoding='utf-8-sig') as fh:
+        blocks = re.split(r'\n\s*\n', fh.read().replace('\r\n', '\n'))
+    cues = []
+    for block in blocks:
+        lines = block.strip().split('\n')
+        timing = next((i for i, line in enumerate(lines) if '-->' in line), None)
+        if timing is None:
+            # WEBVTT header, NOTE or STYLE blocks
+            continue
+        begin, end = lines[timing].split('-->')
+        text = ' '.join(TAG_PATTERN.sub('', line) for line in lines[timing + 1:]).split()
+        if text:
+            # drop cue settings after the end time (e.g. "align:start")
+            cues.append((_timestamp(begin), _timestamp(end.split()[0]), ' '.join(text)))
+    return cues
+
+
+def read_transcript(transcript):
+    if is_subtitle(transcript):
+        return ' '.join(text for _, _, text in read_cues(transcript))
+    with open(transcript) as fh:
+        return fh.read().replace('\n', ' ').replace('  ', ' ')
+
+
+class TranscriptIndex(object):
+    """
+    A full text index of transcripts in a SQLite database, to find
+    every clip and offset where a remix verse is said without reading
+    the whole corpus.
+
+    Transcripts are indexed by their normalized text (as returned by
+    :func:`read_transcript`) and reindexed only when their content
+    changes, which is checked only for those whose size or modification
+    time did. Candidates are found with a FTS5 trigram query, if
+    available, and confirmed by an exact search of the verse, so a verse
+    matches anywhere its text occurs, as in :func:`find_occurrences`.
+
+    >>> index = TranscriptIndex('/tmp/miau/index.sqlite')
+    >>> index.update(['speech.txt', 'debate.srt'])
+    >>> index.locate('I have a dream', ['speech.txt', 'debate.srt'])
+    [('speech.txt', 0), ('speech.txt', 324)]
+    """
+
+    def __init__(self, path=':memory:'):
+        # connections are shared by the server threads, behind the corpus lock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+            with self.db:
+                self.db.execute('DROP TABLE IF EXISTS transcripts')
+                self.db.execute('DROP TABLE IF EXISTS transcripts_fts')
+                self.db.execute('PRAGMA user_version = {}'.format(INDEX_VERSION))
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS transcripts '
+            '(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT, text TEXT)'
+        )
+        try:
+            # trigrams find verses starting or ending inside a word too
+            self.db.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts '
+                'USING fts5(path UNINDEXED, text, tokenize="trigram")'
+            )
+            self.fts = True
+        except sqlite3.OperationalError:
+            logging.warning('SQLite without FTS5 trigrams. Transcripts will be searched one by one')
+            self.fts = False
+
+    def update(self, transcripts):
+        """index new or changed ``transcripts`` and forget the ones removed from disk"""
+        paths = [os.path.abspath(transcript) for transcript in transcripts]
+        with self.db:
+            indexed = {path: (size, mtime, digest) for path, size, mtime, digest in
+                       self.db.execute('SELECT path, size, mtime, hash FROM transcripts')}
+            for path in paths:
+                stat = os.stat(path)
+                size, mtime, digest = indexed.get(path, (None, None, None))
+                if (size, mtime) == (stat.st_size, stat.st_mtime):
+                    continue
+                current = file_hash(path)
+                if digest == current:
+                    # touched, not changed
+                    self.db.execute('UPDATE transcripts SET size = ?, mtime = ? WHERE path = ?',
+                                    (stat.st_size, stat.st_mtime, path))
+                    continue
+                logging.info('Indexing %s', path)
+                self.remove(path)
+                text = read_transcript(path)
+                self.db.execute('INSERT INTO transcripts VALUES (?, ?, ?, ?, ?)',
+                                (path, stat.st_size, stat.st_mtime, current, text))
+                if self.fts:
+                    self.db.execute('INSERT INTO transcripts_fts VALUES (?, ?)', (path, text))
+            for path in indexed:
+                if not os.path.exists(path):
+                    self.remove(path)
+
+    def remove(self, path):
+        self.db.execute('DELETE FROM transcripts WHERE path = ?', (path,))
+        if self.fts:
+            self.db.execute('DELETE FROM transcripts_fts WHERE path = ?', (path,))
+
+    def locate(self, line, transcripts):
+        """
+        return every ``(transcript, offset)`` where the text of ``line``
+        occurs, among the given ``transcripts``, even inside words.
+        """
+        paths = OrderedDict((os.path.abspath(transcript), transcript) for transcript in transcripts)
+        if self.fts and len(line) >= 3:
+            # trigram matches are case insensitive: confirmed below
+            candidates = self.db.execute(
+                'SELECT transcripts.path, transcripts.text FROM transcripts_fts '
+                'JOIN transcripts ON transcripts.path = transcripts_fts.path '
+                'WHERE transcripts_fts MATCH ?', ('"{}"'.format(line.replace('"', '""')),)
+            ).fetchall()
+        else:
+            # without FTS5 or too short for a trigram
+            candidates = self.db.execute(
+                'SELECT path, text FROM transcripts WHERE instr(text, ?) > 0', (line,)
+            ).fetchall()
+        rank = {path: i for i, path in enumerate(paths)}
+        found = []
+        for path, text in sorted(candidates, key=lambda c: rank.get(c[0], -1)):
+            if path not in paths:
+                continue
+            offset = text.find(line)
+            while offset != -1:
+                found.append((paths[path], offset))
+                offset = text.find(line, offset + 1)
+        return found
+
+    def route(self, remix_lines, clips, transcripts):
+        """
+        choose the clips to find ``remix_lines`` in: greedily, the one
+        covering most of the verses left first, regardless of the
+        order of the inputs.
+
+        Return the chosen ``(clip, transcript)`` pairs, in that order,
+        and the lines not found in any transcript.
+        """
+        by_transcript = OrderedDict(zip(transcripts, clips))
+        coverage = OrderedDict((transcript, set()) for transcript in transcripts)
+        not_found = []
+        for line in remix_lines:
+            found = self.locate(line, transcripts)
+            if not found:
+                not_found.append(line)
+            for transcript, _ in found:
+                coverage[transcript].add(line)
+
+        pending = set(remix_lines).difference(not_found)
+        routes = []
+        while pending:
+            # ties keep the order of the inputs
+            transcript = max(coverage, key=lambda t: len(coverage[t] & pending))
+            routes.append((by_transcript[transcript], transcript))
+            pending -= coverage.pop(transcript)
+        return routes, not_found
+
+
+def get_subtitles_database(mvp_clips, transcripts, remix, force_language=None, cache=None,
+                           jobs=1, audio_cache=None):
+    """
+    return the fragments of the remix lines found in subtitle
+    transcripts (see :func:`read_cues`), timed by their cues.
+
+    A verse spanning whole cues takes their timing, without any
+    alignment. A verse starting or ending inside a cue is aligned only
+    against the audio of its cues, padded ``SUBTITLE_PADDING``
+    seconds. Lines not found in subtitles (or whose alignment misses
+    them) are left out, for the other strategies.
+    """
+    remix_lines = list(remix)
+    fragments = OrderedDict()
+    pending = []    # (clip, line)
+    tasks = []
+    for clip, transcript in zip(mvp_clips, transcripts):
+        if not remix_lines:
+            break
+        if not is_subtitle(transcript):
+            continue
+        cues = read_cues(transcript)
+        text = ' '.join(cue_text for _, _, cue_text in cues)
+        starts = []
+        position = 0
+        for _, _, cue_text in cues:
+            starts.append(position)
+            position += len(cue_text) + 1
+        with profiler.stage('find_occurrences', clip=clip):
+            occurrences = find_occurrences(text, remix_lines)
+        remix_lines = [line for line in remix_lines if line not in occurrences]
+
+        language = None
+        for line, start in occurrences.items():
+            end = start + len(line)
+            first = bisect_right(starts, start) - 1
+            last = bisect_left(starts, end) - 1
+            cues_end = starts[last] + len(cues[last][2])
+            if start == starts[first] and end == cues_end:
+                fragments[line] = {'begin': cues[first][0], 'end': cues[last][1], 'clip': clip}
+                continue
+            if language is None:
+                language = detect_language(clip, text, force_language)
+            window = (round(max(0, cues[first][0] - SUBTITLE_PADDING), 3),
+                      round(cues[last][1] + SUBTITLE_PADDING, 3))
+            context = [text[starts[first]:start].strip(), line, text[end:cues_end].strip()]
+            pending.append((clip, line))
+            tasks.append((clip, '\n'.join(l for l in context if l), language, window))
+
+    if tasks:
+        logging.info('Forcing aligment of %s verses inside subtitle cues', len(tasks))
+    outputs = align_many(tasks, cache=cache, jobs=jobs, audio_cache=audio_cache)
+    for (clip, line), output in zip(pending, outputs):
+        f = next((f for f in output['fragments'] if f['lines'][0] == line), None)
+        if f is not None:
+            fragments[line] = {'begin': float(f['begin']), 'end': float(f['end']), 'clip': clip}
+    logging.info('%s verses timed by subtitles', len(fragments))
+    return OrderedDict((line, fragments[line]) for line in remix if line in fragments)
+
+
+def get_words_database(mvp_clips, transcripts, remix, force_language=None, cache=None, jobs=1,
+                       audio_cache=None):
+    """
+    as :func:`get_fragments_database`, but aligning each needed
+    transcript only once at word level, no matter how many remix
+    lines overlap.
+    """
+    remix_lines = list(remix)
+    indexes = []
+    tasks = []
+    for clip, transcript in zip(mvp_clips, transcripts):
+        transcript = read_transcript(transcript)
+        with profiler.stage('word_index', clip=clip):
+            index = WordIndex(transcript.split())
+            found = [line for line in remix_lines if index.find(line) is not None]
+        if not found:
+            continue
+        remix_lines = [line for line in remix_lines if line not in found]
+
+        language = detect_language(clip, transcript, force_language)
+        logging.info('Forcing word level aligment for %s', clip)
+        indexes.append((clip, index, found))
+        tasks.append((clip, index.source(), language))
+        if not remix_lines:
+            break
+    else:
+        if remix_lines:
+            raise ValueError(
+                "Remix verse/s not found in transcripts given:\n{}".format('\n- '.join(remix_lines))
+        )
+
+    fragments = OrderedDict()
+    outputs = align_many(tasks, cache=cache, jobs=jobs, audio_cache=audio_cache)
+    for (clip, index, found), output in zip(indexes, outputs):
+        index.align(output)
+        for line in found:
+            begin, end = index.span(line)
+            fragments[line] = {
+                'begin': begin,
+                'end': end,
+                'clip': clip
+            }
+    return fragments
+
+
+def verse_window(transcript, start, end, duration, padding):
+    """
+    estimate the excerpt of the audio where the verse at
+    ``transcript[start:end]`` is spoken, assuming a constant speech rate,
+    padded ``padding`` seconds to both sides.
+
+    Return the window ``(begin, end)`` in seconds and the text to align:
+    the verse as an independent line between the context that fits
+    in the window.
+    """
+    rate = duration / float(len(transcript))
+    begin = max(0, start * rate - padding)
+    end_ = min(duration, end * rate + padding)
+
+    # expand the context to whole words
+    context_start = int(begin / rate)
+    context_start = transcript.rfind(' ', 0, context_start) + 1 if context_start else 0
+    context_end = min(len(transcript), int(end_ / rate))
+    if transcript.find(' ', context_end) != -1:
+        context_end = transcript.find(' ', context_end)
+    else:
+        context_end = len(transcript)
+
+    lines = [
+        transcript[context_start:start].strip(),
+        transcript[start:end],
+        transcript[end:context_end].strip()
+    ]
+    return (round(begin, 3), round(end_, 3)), '\n'.join(l for l in lines if l)
+
+
+def window_fits(output, line, window, duration):
+    """
+    check the alignment of a window looks reliable: the verse
+    shouldn't be squeezed against an edge of the excerpt, and the
+    context around it should be heard for a while. Edges matching
+    the clip's bounds are not considered.
+    """
+    fragments = output['fragments']
+    for i, f in enumerate(fragments):
+        if f['lines'][0] == line:
+            break
+    else:
+        return False
+    begin, end = float(f['begin']), float(f['end'])
+    if window[0] > 0:
+        if begin - window[0] < WINDOW_MIN_EDGE:
+            return False
+        if i > 0 and float(fragments[0]['end']) - float(fragments[0]['begin']) < WINDOW_MIN_EDGE:
+            return False
+    if window[1] < duration:
+        if window[1] - end < WINDOW_MIN_EDGE:
+            return False
+        if i < len(fragments) - 1 and (
+                float(fragments[-1]['end']) - float(fragments[-1]['begin']) < WINDOW_MIN_EDGE):
+            return False
+    return True
+
+
+def get_windowed_database(mvp_clips, transcripts, remix, debug=False, force_language=None,
+                          cache=None, jobs=1, audio_cache=None):
+    """
+    as :func:`get_fragments_database`, but aligning only a padded
+    excerpt of audio and text around each verse (see :func:`verse_window`).
+
+    Windows that don't pass :func:`window_fits` are doubled and
+    retried. After ``WINDOW_RETRIES`` the remaining verses are aligned
+    against their whole clip.
+    """
+    remix_lines = list(remix)
+    pending = []        # (clip, transcript, line, start, duration, language)
+    for clip, transcript in zip(mvp_clips, transcripts):
+        transcript = read_transcript(transcript)
+        with profiler.stage('find_occurrences', clip=clip):
+            occurrences = find_occurrences(transcript, remix_lines)
+        if not occurrences:
+            continue
+        remix_lines = [line for line in remix_lines if line not in occurrences]
+        language = detect_language(clip, transcript, force_language)
+        duration = media_duration(clip)
+        pending.extend(
+            (clip, transcript, line, start, duration, language)
+            for line, start in occurrences.items()
+        )
+        if not remix_lines:
+            break
+    else:
+        if remix_lines:
+            raise ValueError(
+                "Remix verse/s not found in transcripts given:\n{}".format('\n- '.join(remix_lines))
+        )
+
+    fragments = OrderedDict()
+    padding = WINDOW_PADDING
+    for attempt in range(WINDOW_RETRIES + 1):
+        if not pending:
+            break
+        logging.info('Forcing windowed aligment of %s verses (padding %ss)', len(pending), padding)
+        tasks = []
+        for clip, transcript, line, start, duration, language in pending:
+            window, source = verse_window(transcript, start, start + len(line), duration, padding)
+            tasks.append((clip, source, language, window))
+
+        missed = []
+        outputs = align_many(tasks, cache=cache, jobs=jobs, audio_cache=audio_cache)
+        for verse, task, output in zip(pending, tasks, outputs):
+            clip, _, line, _, duration, _ = verse
+            if not window_fits(output, line, task[3], duration):
+                missed.append(verse)
+                continue
+            f = next(f for f in output['fragments'] if f['lines'][0] == line)
+            fragments[line] = {
+                'begin': float(f['begin']),
+                'end': float(f['end']),
+                'clip': clip
+            }
+        pending = missed
+        padding *= 2
+
+    if pending:
+        logging.info('Windows missed for %s verses. Aligning whole clips', len(pending))
+        fallback = [verse[2] for verse in pending]
+        fragments.update(get_fragments_database(
+            mvp_clips, transcripts, fallback, debug=debug,
+            force_language=force_language, cache=cache, jobs=jobs, audio_cache=audio_cache
+        ))
+    return OrderedDict((line, fragments[line]) for line in remix if line in fragments)
+
+
+def get_fragments_database(mvp_clips, transcripts, remix, debug=False, force_language=None,
+                           cache=None, jobs=1, audio_cache=None):
+    """
+    generate a dictionary containing segment information for every
+    line produced by :func:`fragmenter`. Timings are the aligned ones,
+    fine tuning offsets are applied by :func:`apply_offsets`.
+
+    :parameter clips: list of input clip filenames
+    :parameter transcripts: raw texts of transcripts. map one-one to clips
+    :remix: remix lines (e.g. the dictionary of lines returned by :func:`read_remix`)
+    :parameter cache: optional :class:`DiskCache` for aeneas' output
+    :parameter jobs: number of alignments to run in parallel
+    :parameter audio_cache: optional :class:`DiskCache` for the audio given
+                            to aeneas (see :func:`aligner_audio`)
+
+    """
+    sources_by_clip = OrderedDict()
+    remix_lines = list(remix)
+
+    #
+    for clip, transcript in zip(mvp_clips, transcripts):
+        transcript = read_transcript(transcript)
+        with profiler.stage('fragmenter', clip=clip):
+            sources_by_clip[clip], remix_lines = fragmenter(transcript, remix_lines, debug=debug)
+        if not remix_lines:
+            break
+    else:
+        if remix_lines:
+            raise ValueError(
+                "Remix verse/s not found in transcripts given:\n{}".format('\n- '.join(remix_lines))
+        )
+
+    # create Task object
+    tasks = []
+    for clip, sources in sources_by_clip.items():
+        l_sources = len(sources)
+        for i, source in enumerate(sources, 1):
+            if i == 1:
+                # for first iteration of the clip, autodetect the language
+                language = detect_language(clip, source, force_language)
+
+            logging.info('Forcing aligment for %s (step %s/%s)', clip, i, l_sources)
+            tasks.append((clip, source, language))
+
+    fragments = OrderedDict()
+    outputs = align_many(tasks, cache=cache, jobs=jobs, audio_cache=audio_cache)
+    for (clip, _, _), output in zip(tasks, outputs):
+        for f in output['fragments']:
+            line = f['lines'][0]
+            fragments[line] = {
+                'begin': float(f['begin']),
+                'end': float(f['end']),
+                'clip': clip
+            }
+    if debug:
+        d = tempfile.mkstemp(suffix='.json')[1]
+        json.dump(fragments, open(d, 'w'), indent=2)
+        logging.debug('Segments database written to {}'.format(d))
+    return fragments
+
+
+def find_fragments(clips, transcripts, missing, words=False, windowed=False, debug=False,
+                   force_language=None, cache=None, jobs=1, audio_cache=None):
+    """
+    return the raw fragments of the ``missing`` lines: those found in
+    subtitles timed by their cues (see :func:`get_subtitles_database`),
+    and the rest aligned at word level, by windows or by fragments,
+    according ``words`` and ``windowed`` (see :func:`miau`).
+    """
+    fragments = OrderedDict()
+    if any(is_subtitle(transcript) for transcript in transcripts):
+        fragments.update(get_subtitles_database(
+            clips, transcripts, missing,
+            force_language=force_language, cache=cache, jobs=jobs, audio_cache=audio_cache
+        ))
+        missing = [line for line in missing if line not in fragments]
+    if not missing:
+        return fragments
+    if words:
+        database = get_words_database(
+            clips, transcripts, missing,
+            force_language=force_language, cache=cache, jobs=jobs, audio_cache=audio_cache
+        )
+    elif windowed:
+        database = get_windowed_database(
+            clips, transcripts, missing, debug=debug,
+            force_language=force_language, cache=cache, jobs=jobs, audio_cache=audio_cache
+        )
+    else:
+        database = get_fragments_database(
+            clips, transcripts, missing, debug=debug,
+            force_language=force_language, cache=cache, jobs=jobs, audio_cache=audio_cache
+        )
+    fragments.update(database)
+    return fragments
+
+
+_envelopes = {}
+
+
+def energy_envelope(clip, cache=None, blocksize=4096):
+    """
+    return the RMS energy of the audio of ``clip`` every ``SNAP_HOP``
+    seconds, as a numpy array. It's computed once, reading the decoded
+    audio by blocks of ``blocksize`` hops, and kept in ``cache`` (a
+    :class:`DiskCache`) keyed by the content of the clip.
+    """
+    import numpy
+
+    key = DiskCache.key(file_hash(clip), 'rms', SNAP_RATE, SNAP_HOP)
+    if key in _envelopes:
+        return _envelopes[key]
+    filename = cache.lookup(key, '.npy') if cache is not None else None
+    if filename is not None:
+        envelope = numpy.load(filename)
+    else:
+        hop = int(SNAP_RATE * SNAP_HOP)
+        proc = subprocess.Popen(
+            [ffmpeg_binary(), '-loglevel', 'error', '-i', clip, '-vn', '-ac', '1',
+             '-ar', str(SNAP_RATE), '-f', 's16le', '-'],
+            stdout=subprocess.PIPE
+        )
+        blocks = []
+        while True:
+            data = proc.stdout.read(hop * blocksize * 2)
+            if not data:
+                break
+            samples = numpy.frombuffer(data[:len(data) // (hop * 2) * hop * 2], dtype='<i2')
+            samples = samples.astype('float32').reshape(-1, hop) / 32768
+            blocks.append(numpy.sqrt(numpy.mean(samples ** 2, axis=1)))
+        proc.wait()
+        envelope = numpy.concatenate(blocks) if blocks else numpy.zeros(0, dtype='float32')
+        if cache is not None:
+            with tempfile.NamedTemporaryFile(dir=cache.path, suffix='.tmp', delete=False) as fh:
+                numpy.save(fh, envelope)
+            if cache.store(key, fh.name, '.npy') == fh.name:
+                os.remove(fh.name)
+    _envelopes[key] = envelope
+    return envelope
+
+
+def snap_fragments(fragments, tolerance=SNAP_TOLERANCE, cache=None):
+    """
+    move the begin and the end of each fragment to the quietest point of
+    its clip's audio (see :func:`energy_envelope`) within ``tolerance``
+    seconds, the nearest one among equally quiet points. Cuts already
+    in their quietest point aren't moved, nor those without a clear
+    pause in reach: the quietest point must have less than ``SNAP_QUIET``
+    times the energy of the loudest one, or it's just noise.
+
+    Every cut of a clip is snapped at once with numpy. A fragment that
+    would become empty keeps its timing. Return the new fragments.
+    """
+    import numpy
+
+    by_clip = OrderedDict()
+    for line, fragment in fragments.items():
+        by_clip.setdefault(fragment['clip'], []).append(line)
+    reach = int(round(tolerance / SNAP_HOP))
+    offsets = numpy.arange(-reach, reach + 1)
+    snapped = OrderedDict((line, dict(fragment)) for line, fragment in fragments.items())
+    for clip, lines in by_clip.items():
+        envelope = energy_envelope(clip, cache)
+        if not len(envelope):
+            continue
+        times = numpy.array([[fragments[line]['begin'], fragments[line]['end']] for line in lines])
+        hops = numpy.clip((times / SNAP_HOP).astype(int), 0, len(envelope) - 1)
+        candidates = numpy.clip(hops[..., numpy.newaxis] + offsets, 0, len(envelope) - 1)
+        # break ties in favour of the nearest hop
+        score = envelope[candidates] + numpy.abs(offsets) * (envelope.max() * 1e-6 + 1e-12)
+        best = numpy.take_along_axis(candidates, score.argmin(axis=-1)[..., numpy.newaxis], -1)
+        best = best[..., 0]
+        quiet = envelope[best] < SNAP_QUIET * envelope[candidates].max(axis=-1)
+        times = numpy.where((best == hops) | ~quiet, times, (best + 0.5) * SNAP_HOP)
+        for line, (begin, end) in zip(lines, times.tolist()):
+            if end - begin > SNAP_HOP:
+                snapped[line]['begin'], snapped[line]['end'] = round(begin, 3), round(end, 3)
+    return snapped
+
+
+def apply_offsets(remix_lines, fragments):
+    """
+    return the remix data for ``remix_lines`` (a dictionary of lines
+    and their offsets, as returned by :func:`fine_tuning`) taking the
+    timing of each line from ``fragments`` and applying its offsets.
+    """
+    remix_data = []
+    for line, offsets in remix_lines.items():
+        fragment = fragments[line]
+        remix_data.append((line, {
+            'begin': fragment['begin'] + offsets['offset_begin'],
+            'end': fragment['end'] + offsets['offset_end'],
+            'clip': fragment['clip']
+        }))
+    return remix_data
+
+
+def output_type_of(output_file):
+    """return ``'audio'`` or ``'video'`` according the extension of ``output_file``"""
+    from moviepy.tools import extensions_dict
+
+    if is_playlist(output_file):
+        return 'video'
+    output_extension = os.path.splitext(output_file)[1][1:]
+    if output_extension not in extensions_dict:
+        raise ValueError(
+            'Output format not supported: {}'.format(output_extension)
+        )
+    return extensions_dict[output_extension]['type']
+
+
+def default_output(remix):
+    # default to a video with the same filename than the remix
+    return '{}.mp4'.format(os.path.basename(remix).rsplit('.')[0])
+
+
+def parse_remix(lines):
+    """
+    return an ordered dictionary of each line of a remix script and
+    its offsets (see :func:`fine_tuning`), skipping blanks and comments.
+    """
+    remix_lines = OrderedDict()
+    for l in lines:
+        l = l.strip()
+        if not l or l.startswith('#'):
+            continue
+        remix_lines.update(fine_tuning(l))
+    return remix_lines
+
+
+def read_remix(remix):
+    """
+    read a remix file and return a tuple ``(remix_data, remix_lines)``.
+
+    If it's a json file (as generated by the ``dump`` option), ``remix_data``
+    is its content and ``remix_lines`` is ``None``. Otherwise ``remix_data``
+    is ``None`` and ``remix_lines`` is an ordered dictionary of each
+    line of the script and its offsets (see :func:`fine_tuning`).
+    """
+    with open(remix) as remix_fh:
+        try:
             # read data from a json file (as generated by --dump option)
             # this skip the aligment
-            remix_data = json.load(remix_fh)
+            return json.load(remix_fh), None
         except json.JSONDecodeError:
             remix_fh.seek(0)
-            remix_lines = OrderedDict()
-            for l in remix_fh:
-                l = l.strip()
-                if not l or l.startswith('#'):
-                    continue
-                remix_lines.update(fine_tuning(l))
-            fragments = get_fragments_database(
-                clips, transcripts, remix_lines,
-                debug=debug, force_language=force_language
+            return None, parse_remix(remix_fh)
+
+
+def check_remix_data(remix_data):
+    """
+    raise a ``ValueError`` unless ``remix_data`` looks like a dumped
+    remix: a list of ``[line, {'clip': ..., 'begin': ..., 'end': ...}]``.
+    """
+    def number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    if not isinstance(remix_data, list) or not remix_data:
+        raise ValueError('Remix data must be a non empty list of verses')
+    for i, verse in enumerate(remix_data, 1):
+        if not (isinstance(verse, (list, tuple)) and len(verse) == 2 and
+                isinstance(verse[0], str) and isinstance(verse[1], dict) and
+                isinstance(verse[1].get('clip'), str) and
+                number(verse[1].get('begin')) and number(verse[1].get('end'))):
+            raise ValueError('Verse {} of the remix data must be [line, {{"clip": ..., '
+                             '"begin": ..., "end": ...}}]'.format(i))
+
+
+class Corpus(object):
+    """
+    the input clips and their transcripts, keeping the fragments
+    aligned so far, so many remixes can be resolved aligning
+    each line only once.
+
+    Arguments are those of :func:`miau`.
+    """
+
+    def __init__(self, clips, transcripts, debug=False, force_language=None, cache_dir=None,
+                 words=False, windowed=False, jobs=1, index=False, snap=False):
+        self.clips = clips
+        self.transcripts = transcripts
+        self.debug = debug
+        self.force_language = force_language
+        self.cache_dir = cache_dir
+        self.words = words
+        self.windowed = windowed
+        self.jobs = jobs
+        self.snap = snap
+        self.cache = DiskCache(os.path.join(cache_dir, 'alignments')) if cache_dir else None
+        self.probe_cache = DiskCache(os.path.join(cache_dir, 'probes')) if cache_dir else None
+        self.audio_cache = DiskCache(
+            os.path.join(cache_dir, 'audio'), max_size=AUDIO_CACHE_MAX_SIZE
+        ) if cache_dir else None
+        self.envelope_cache = DiskCache(os.path.join(cache_dir, 'envelopes')) if cache_dir else None
+        self.pcm_cache = DiskCache(
+            os.path.join(cache_dir, 'pcm'), max_size=PCM_CACHE_MAX_SIZE
+        ) if cache_dir else None
+        self.index = None
+        if index:
+            self.index = TranscriptIndex(
+                os.path.join(cache_dir, 'index.sqlite') if cache_dir else ':memory:'
             )
-            remix_data = [(l, fragments[l]) for l in remix_lines]
+            with profiler.stage('index'):
+                self.index.update(transcripts)
+        self.segment_cache = DiskCache(
+            os.path.join(cache_dir, 'segments'), max_size=SEGMENT_CACHE_MAX_SIZE
+        ) if cache_dir else None
+        self.probes = OrderedDict()
+        for filename in clips:
+            with profiler.stage('probe', clip=filename):
+                self.probes[filename] = probe(filename, cache=self.probe_cache)
+        self.fragments = {}
+
+    def all_videos(self):
+        return all(info['video'] for info in self.probes.values())
+
+    def align(self, remix_lines):
+        """find the fragments of the lines not aligned yet"""
+        missing = [line for line in remix_lines if line not in self.fragments]
+        if not missing:
+            return
+        fragments = self.find(missing)
+        if self.snap:
+            with profiler.stage('snap'):
+                fragments = snap_fragments(fragments, cache=self.envelope_cache)
+        self.fragments.update(fragments)
+
+    def route(self, missing):
+        """
+        return the clips and transcripts to find the ``missing`` lines in:
+        all of them or, with an index, those chosen by :meth:`TranscriptIndex.route`.
+        """
+        if self.index is None:
+            return self.clips, self.transcripts
+        with profiler.stage('route'):
+            routes, not_found = self.index.route(missing, self.clips, self.transcripts)
+        if not_found:
+            raise ValueError("Remix verse/s not found in transcripts given:\n{}".format(
+                '\n- '.join(not_found)
+            ))
+        logging.info('Routing %s verses to %s of %s clips',
+                     len(missing), len(routes), len(self.clips))
+        return [clip for clip, _ in routes], [transcript for _, transcript in routes]
+
+    def options(self):
+        """arguments of :func:`find_fragments` set for this corpus"""
+        return dict(
+            words=self.words, windowed=self.windowed, debug=self.debug,
+            force_language=self.force_language, cache=self.cache, jobs=self.jobs,
+            audio_cache=self.audio_cache
+        )
+
+    def assign(self, missing):
+        """
+        return an ordered dictionary of the clips having the ``missing``
+        lines: for each one, its transcript and the lines found first
+        in it, as the alignment strategies take them.
+        """
+        clips, transcripts = self.route(missing)
+        assigned = OrderedDict()
+        pending = list(missing)
+        for clip, transcript in zip(clips, transcripts):
+            occurrences = find_occurrences(read_transcript(transcript), pending)
+            if occurrences:
+                assigned[clip] = (transcript, [line for line in pending if line in occurrences])
+                pending = [line for line in pending if line not in occurrences]
+            if not pending:
+                break
+        else:
+            if pending:
+                raise ValueError(
+                    "Remix verse/s not found in transcripts given:\n{}".format('\n- '.join(pending))
+                )
+        return assigned
+
+    def find(self, missing):
+        """return the raw fragments of the ``missing`` lines"""
+        clips, transcripts = self.route(missing)
+        return find_fragments(clips, transcripts, missing, **self.options())
+
+    def resolve(self, remix_lines):
+        """return the remix data of ``remix_lines``, aligning them if needed"""
+        self.align(remix_lines)
+        return apply_offsets(remix_lines, self.fragments)
+
+    def refresh(self, changed):
+        """
+        forget what was known of the ``changed`` input files: probe each
+        clip again and drop the fragments aligned from it or from its
+        transcript. Return the clips affected.
+        """
+        clips = set()
+        for clip, transcript in zip(self.clips, self.transcripts):
+            if clip in changed or transcript in changed:
+                clips.add(clip)
+            if clip in changed:
+                self.probes[clip] = probe(clip, cache=self.probe_cache)
+        self.fragments = {
+            line: fragment for line, fragment in self.fragments.items()
+            if fragment['clip'] not in clips
+        }
+        if self.index is not None and set(changed).intersection(self.transcripts):
+            self.index.update(self.transcripts)
+        return clips
+
+    def validate(self, remix_data):
+        check_remix_data(remix_data)
+        unknown = set(data['clip'] for _, data in remix_data).difference(self.probes)
+        if unknown:
+            raise ValueError('Remix refers to clips not given as input: {}'.format(', '.join(unknown)))
+
+
+def piece_args(data, piece, output_type, codecs, streams, size=None, fps=None,
+               muxer=('-f', 'matroska')):
+    """
+    ffmpeg arguments to cut a segment of the remix to ``piece`` with the
+    ``codecs`` given (video and audio) and the ``muxer`` arguments. Videos
+    are scaled to ``size`` and ``fps``. Clips without audio get silence,
+    so every piece can be joined.
+    """
+    duration = '{:.3f}'.format(data['end'] - data['begin'])
+    args = ['-ss', '{:.3f}'.format(data['begin']), '-t', duration, '-i', data['clip']]
+    audio = ['-ar', STREAM_AUDIO_FPS, '-ac', 2]
+    if output_type == 'audio':
+        return args + ['-vn', '-c:a', codecs[1]] + audio + list(muxer) + [piece]
+    maps = ['-map', '0:v:0', '-map', '0:a:0']
+    if not streams['audio']:
+        args += ['-f', 'lavfi', '-t', duration, '-i',
+                 'anullsrc=r={}:cl=stereo'.format(STREAM_AUDIO_FPS)]
+        maps[-1] = '1:a:0'
+    filters = (['scale={}:{}'.format(*size)] if size else []) + (['fps={}'.format(fps)] if fps else [])
+    return args + maps + [
+        '-vf', ','.join(filters + ['format=yuv420p']),
+        '-c:v', codecs[0], '-c:a', codecs[1]] + audio + list(muxer) + [piece]
+
+
+async def _ffmpeg_async(*args):
+    command = [ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y']
+    command += [str(arg) for arg in args]
+    proc = await asyncio.create_subprocess_exec(*command)
+    if await proc.wait():
+        raise subprocess.CalledProcessError(proc.returncode, command)
+
+
+async def _pipeline(corpus, output_file, output_type, workdir, remix_lines=None, remix_data=None):
+    loop = asyncio.get_running_loop()
+    cuts = OrderedDict()
+    # the cut of each span, shared by the verses repeating it
+    spans = {}
+    size = fps = None
+    if output_type == 'video':
+        codecs, muxer = output_codecs(output_file), ('-f', 'matroska')
+    else:
+        codecs, muxer = (None, 'pcm_s16le'), ('-f', 'wav')
+    # ffmpeg cuts running at once
+    semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+
+    async def cut(i, data):
+        piece = os.path.join(workdir, '{:05d}.{}'.format(i, 'mkv' if output_type == 'video' else 'wav'))
+        async with semaphore:
+            with profiler.stage('cut_segment', clip=data['clip']):
+                await _ffmpeg_async(*piece_args(data, piece, output_type, codecs,
+                                                corpus.probes[data['clip']], size, fps, muxer))
+        return piece
+
+    def schedule(i, line, data):
+        span = segment_span(data)
+        if span not in spans:
+            logging.info('Cutting segment %s: %s', i + 1, line)
+            spans[span] = asyncio.ensure_future(cut(i, data))
+        cuts[i] = (line, data, spans[span])
+
+    if remix_data is not None:
+        assigned = OrderedDict()
+        first = remix_data[0][1]['clip']
+    else:
+        missing = [line for line in remix_lines if line not in corpus.fragments]
+        assigned = corpus.assign(missing) if missing else OrderedDict()
+        line = next(iter(remix_lines))
+        first = corpus.fragments[line]['clip'] if line in corpus.fragments else next(
+            clip for clip, (_, lines) in assigned.items() if line in lines
+        )
+    if output_type == 'video':
+        # the frame size and rate of the output are those of the first clip
+        size, fps = corpus.probes[first]['video']['size'], corpus.probes[first]['video']['fps']
+
+    positions = {line: i for i, line in enumerate(remix_lines or ())}
+
+    def resolved(lines):
+        for line in lines:
+            data = apply_offsets(OrderedDict([(line, remix_lines[line])]), corpus.fragments)
+            schedule(positions[line], line, data[0][1])
+
+    async def align(executor, clip, transcript, lines):
+        options = dict(corpus.options(), jobs=1)
+        fragments, records = await loop.run_in_executor(executor, partial(
+            _profiled, find_fragments, [clip], [transcript], lines, **options
+        ))
+        profiler.merge(records)
+        if corpus.snap:
+            # the energy envelopes are decoded off the event loop
+            fragments = await loop.run_in_executor(None, partial(
+                snap_fragments, fragments, cache=corpus.envelope_cache
+            ))
+        corpus.fragments.update(fragments)
+        logging.info('Aligned %s verses of %s', len(lines), clip)
+        resolved(lines)
+
+    try:
+        if remix_data is not None:
+            for i, (line, data) in enumerate(remix_data):
+                schedule(i, line, data)
+        else:
+            resolved([line for line in remix_lines if line in corpus.fragments])
+        if assigned:
+            with ProcessPoolExecutor(max_workers=max(1, corpus.jobs)) as executor:
+                await asyncio.gather(*[
+                    align(executor, clip, transcript, lines)
+                    for clip, (transcript, lines) in assigned.items()
+                ])
+        return [(line, data, await future) for line, data, future in
+                (cuts[i] for i in sorted(cuts))]
+    finally:
+        for future in spans.values():
+            future.cancel()
+
+
+def render_pipeline(corpus, output_file, output_type, remix_lines=None, remix_data=None):
+    """
+    align and render the remix overlapping both: each clip is aligned
+    in a pool of ``corpus.jobs`` processes and, as soon as the timing of
+    its verses is known, they are cut by ffmpeg processes coordinated
+    by asyncio (see :func:`piece_args`). Only the final join waits
+    for the last verse.
+
+    Give the ``remix_lines`` of a script or the ``remix_data`` of a dump.
+    Return the remix data.
+    """
+    workdir = tempfile.mkdtemp(prefix='miau-')
+    try:
+        with profiler.stage('pipeline'):
+            cuts = asyncio.run(_pipeline(corpus, output_file, output_type, workdir,
+                                         remix_lines=remix_lines, remix_data=remix_data))
+        pieces = [piece for _, _, piece in cuts]
+        durations = [data['end'] - data['begin'] for _, data, _ in cuts]
+        dedupe_segments([(line, data) for line, data, _ in cuts])
+        logging.info('Creating output file')
+        with profiler.stage('concat'):
+            if output_type == 'video':
+                concat_files(pieces, output_file, '-c', 'copy', durations=durations)
+            else:
+                concat_files(pieces, output_file, '-c:a', output_codecs(output_file)[0],
+                             durations=durations)
+        check_duration(output_file, durations)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return [(line, data) for line, data, _ in cuts]
+
+
+def mp4_boxes(data, start=0, end=None):
+    """
+    yield the type and offset of each box of the mp4 ``data``, depth
+    first, entering the ``MP4_CONTAINERS`` only.
+    """
+    offset, end = start, len(data) if end is None else end
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from('>I4s', data, offset)
+        if size < 8:
+            break
+        yield kind, offset
+        if kind in MP4_CONTAINERS:
+            for box in mp4_boxes(data, offset + 8, offset + size):
+                yield box
+        offset += size
+
+
+def init_size(filename):
+    """
+    return the size in bytes of the initialization section of a
+    fragmented mp4: the boxes before the first ``moof``.
+    """
+    with open(filename, 'rb') as fh:
+        data = fh.read()
+    for kind, offset in mp4_boxes(data):
+        if kind == b'moof':
+            return offset
+    raise ValueError('{} is not a fragmented mp4'.format(filename))
+
+
+def shift_fragments(filename, seconds, sequence=1):
+    """
+    move the fragments of the fragmented mp4 ``filename`` ``seconds``
+    later and number them from ``sequence``, in place, so pieces encoded
+    one by one play as a single timeline. Return the next number.
+    """
+    with open(filename, 'rb') as fh:
+        data = bytearray(fh.read())
+    timescales = {}
+    track = None
+    for kind, offset in mp4_boxes(data):
+        # 64 bits times in version 1 boxes
+        wide = data[offset + 8] == 1
+        if kind == b'tkhd':
+            track = struct.unpack_from('>I', data, offset + (28 if wide else 20))[0]
+        elif kind == b'mdhd':
+            timescales[track] = struct.unpack_from('>I', data, offset + (28 if wide else 20))[0]
+        elif kind == b'mfhd':
+            struct.pack_into('>I', data, offset + 12, sequence)
+            sequence += 1
+        elif kind == b'tfhd':
+            track = struct.unpack_from('>I', data, offset + 12)[0]
+        elif kind == b'tfdt':
+            fmt = '>Q' if wide else '>I'
+            time = struct.unpack_from(fmt, data, offset + 12)[0]
+            struct.pack_into(fmt, data, offset + 12, time + int(round(seconds * timescales[track])))
+    with open(filename, 'wb') as fh:
+        fh.write(data)
+    return sequence
+
+
+def write_playlist(output_file, entries, target_duration, complete=False):
+    """
+    write the HLS playlist ``output_file`` (replacing it at once) for the
+    segments rendered so far. ``entries`` are tuples of the duration,
+    filename, size and initialization size of each segment.
+    """
+    lines = ['#EXTM3U', '#EXT-X-VERSION:7',
+             '#EXT-X-TARGETDURATION:{}'.format(target_duration),
+             '#EXT-X-PLAYLIST-TYPE:EVENT', '#EXT-X-INDEPENDENT-SEGMENTS']
+    for duration, filename, size, init in entries:
+        # every piece has its own timeline and initialization section
+        name = os.path.basename(filename)
+        lines += [
+            '#EXT-X-DISCONTINUITY',
+            '#EXT-X-MAP:URI="{}",BYTERANGE="{}@0"'.format(name, init),
+            '#EXTINF:{:.3f},'.format(duration),
+            '#EXT-X-BYTERANGE:{}@{}'.format(size - init, init),
+            name,
+        ]
+    if complete:
+        lines.append('#EXT-X-ENDLIST')
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(os.path.abspath(output_file)),
+                                     suffix='.tmp', delete=False) as fh:
+        fh.write('\n'.join(lines) + '\n')
+    os.replace(fh.name, output_file)
+
+
+def render_hls(remix_data, output_file, probe_cache=None):
+    """
+    render the remix as an HLS playlist, progressively: each verse is
+    encoded to a fragmented mp4 next to ``output_file`` (named after it)
+    and added to the playlist as soon as it's done, so playback can
+    start once the first verse is. Fragments are shifted to follow each
+    other (see :func:`shift_fragments`) and repeated spans are copies of
+    the segment encoded first (see :func:`segment_span`).
+
+    The frame size and rate are those of the first clip.
+
+    :param probe_cache: optional :class:`DiskCache` for :func:`probe`
+    """
+    prefix = os.path.splitext(output_file)[0]
+    streams = {data['clip']: probe(data['clip'], cache=probe_cache) for _, data in remix_data}
+    video = streams[remix_data[0][1]['clip']]['video']
+    target_duration = int(math.ceil(max(data['end'] - data['begin'] for _, data in remix_data)))
+    # the first piece of each span and its position
+    segments = {}
+    entries = []
+    elapsed = 0
+    sequence = 1
+    for i, (line, data) in enumerate(remix_data, 1):
+        span = segment_span(data)
+        piece = '{}-{:05d}.mp4'.format(prefix, i)
+        if span in segments:
+            shutil.copyfile(segments[span][0], piece)
+            shift = elapsed - segments[span][1]
+        else:
+            logging.info('Encoding segment %s/%s: %s', i, len(remix_data), line)
+            profiler.count('segments')
+            with profiler.stage('cut_segment', clip=data['clip']):
+                ffmpeg(*piece_args(data, piece, 'video', HLS_CODECS, streams[data['clip']],
+                                   video['size'], video['fps'], HLS_MUXER))
+            segments[span] = (piece, elapsed)
+            shift = elapsed
+        sequence = shift_fragments(piece, shift, sequence)
+        duration = data['end'] - data['begin']
+        entries.append((duration, piece, os.path.getsize(piece), init_size(piece)))
+        elapsed += duration
+        write_playlist(output_file, entries, target_duration, complete=i == len(remix_data))
+
+
+def render(remix_data, output_file, output_type, mvp_clips, engine='moviepy', probe_cache=None,
+           segment_cache=None, preview=False, captions=False, chunks=1, pcm_cache=None,
+           crossfade=0):
+    """
+    write the remix to ``output_file``.
+
+    :param mvp_clips: :class:`LazyClips` used by the moviepy engine.
+    :param engine: ``'moviepy'``, ``'ffmpeg'`` (see :func:`render_ffmpeg`),
+                   ``'stream'`` (see :func:`render_stream`) or, for audio,
+                   ``'pcm'`` (see :func:`render_pcm`).
+                   If ffmpeg can't handle the inputs, moviepy is used.
+    :param segment_cache: if given, moviepy renders segment by segment
+                          reusing cached ones (see :func:`render_segments`).
+    :param preview: render a fast draft, with moviepy if the engine is ffmpeg.
+    :param captions: burn each verse and its timing into the preview.
+    :param chunks: if greater than 1, render that many pieces of the remix in
+                   parallel (see :func:`render_chunked`), unless the
+                   ffmpeg engine or the segment cache is used.
+    :param pcm_cache: optional :class:`DiskCache` for the pcm engine.
+    :param crossfade: seconds each verse fades into the next with the pcm engine.
+
+    Segments repeated in the remix are rendered only once (see
+    :func:`dedupe_segments`): the stream engine (and chunks) replay them,
+    and moviepy renders segment by segment as with a ``segment_cache``.
+
+    If ``output_file`` is a playlist (``.m3u8``), it's rendered progressively
+    by :func:`render_hls` whatever the engine.
+    """
+    repeated = len(dedupe_segments(remix_data)) < len(remix_data)
+    if is_playlist(output_file):
+        logging.info('Creating output playlist')
+        with profiler.stage('render_hls'):
+            return render_hls(remix_data, output_file, probe_cache=probe_cache)
+    params = {}
+    if preview:
+        params = PREVIEW_VIDEO_PARAMS if output_type == 'video' else PREVIEW_AUDIO_PARAMS
+    elif engine == 'ffmpeg':
+        logging.info('Creating output file')
+        try:
+            with profiler.stage('render_ffmpeg'):
+                return render_ffmpeg(remix_data, output_file, output_type, cache=probe_cache)
+        except (ValueError, subprocess.CalledProcessError) as e:
+            logging.warning('Falling back to moviepy: %s', e)
+    elif engine == 'pcm':
+        if output_type == 'audio':
+            logging.info('Creating output file')
+            with profiler.stage('render_pcm'):
+                return render_pcm(remix_data, output_file, cache=pcm_cache, crossfade=crossfade,
+                                  probe_cache=probe_cache)
+        logging.warning('Falling back to moviepy: the pcm engine only renders audio')
+
+    if segment_cache is not None:
+        logging.info('Creating output file')
+        return render_segments(remix_data, output_file, output_type, mvp_clips, segment_cache,
+                               params=params, preview=preview, captions=captions)
+
+    if chunks > 1 and len(remix_data) > 1:
+        logging.info('Creating output file')
+        return render_chunked(remix_data, output_file, output_type, mvp_clips, chunks,
+                              params=params, preview=preview, captions=captions)
+
+    if engine == 'stream':
+        logging.info('Creating output file')
+        return render_stream(remix_data, output_file, output_type, mvp_clips, params=params,
+                             preview=preview, captions=captions)
+
+    if repeated:
+        # render each span once to a throwaway cache and join the pieces
+        logging.info('Creating output file, segment by segment')
+        workdir = tempfile.mkdtemp(prefix='miau-')
+        try:
+            return render_segments(remix_data, output_file, output_type, mvp_clips,
+                                   DiskCache(workdir, max_size=math.inf), params=params,
+                                   preview=preview, captions=captions, hash_clips=False)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output_clip = make_remix(remix_data, mvp_clips, output_type, preview=preview, captions=captions)
+    method = 'write_videofile' if output_type == 'video' else 'write_audiofile'
+    logging.info('Creating output file')
+    with profiler.stage('write'):
+        getattr(output_clip, method)(output_file, **params)
+
+
+def miau(clips, transcripts, remix, output_file=None, dump=None, debug=False,
+         force_language=None, cache_dir=None, words=False, windowed=False, jobs=1,
+         engine='moviepy', incremental=False, clear_cache=False, preview=False, captions=False,
+         index=False, chunks=1, snap=False, pipeline=False, crossfade=0):
+    """Main miau entrypoint
+
+    :param clips: list of audio/video files (as supported by moviepy).
+    :param transcripts: list of transcriptions filenames, in the
+                        same order of ``clips``.
+    :param remix: remix filename. Could be a raw text or a json file as
+                  generated by ``dump`` option. If it's a json, forced
+                  aligment is skipped.
+    :param output_file: filename of the generated audio/video file. Format
+                        is inferred from the extension.
+    :param dump: if ``True``, generate a json file that can replace the
+                 text based remix, useful for a manual tuning.
+    :param debug: verbose output if ``True``.
+    :param forced_language: By default language is inferred from a portion
+                            of each transcript. If a 2-letter language code
+                            is passed, it overrides that.
+    :param cache_dir: directory where aeneas' results, clips' probes and
+                      rendered segments are cached. If ``None`` every alignment
+                      is computed from scratch.
+    :param words: if ``True``, align each transcript once at word level
+                  (see :class:`WordIndex`) instead of once per
+                  :func:`fragmenter` iteration.
+    :param windowed: if ``True``, only align excerpts around each remix
+                     line (see :func:`get_windowed_database`).
+    :param jobs: number of forced alignments to run in parallel.
+    :param engine: ``'moviepy'``, ``'ffmpeg'`` (see :func:`render_ffmpeg`),
+                   ``'stream'`` (see :func:`render_stream`) or, for audio,
+                   ``'pcm'`` (see :func:`render_pcm`).
+                   If ffmpeg can't handle the inputs, moviepy is used.
+    :param incremental: if ``True`` (and there is a ``cache_dir``), reuse the
+                        segments rendered before (see :func:`render_segments`).
+    :param clear_cache: if ``True``, remove the cached segments first.
+    :param preview: if ``True``, render a fast, low quality draft.
+    :param captions: if ``True``, burn each verse and its timing into the preview.
+    :param index: if ``True``, pick the clips to align each verse from with a
+                  full text index of the transcripts (see :class:`TranscriptIndex`),
+                  kept in ``cache_dir``.
+    :param chunks: number of pieces of the remix rendered in parallel
+                   processes (see :func:`render_chunked`).
+    :param snap: if ``True``, move each aligned cut to the quietest point
+                 nearby (see :func:`snap_fragments`) before applying the
+                 offsets of the remix.
+    :param pipeline: if ``True``, cut each verse with ffmpeg as soon as its
+                     clip is aligned (see :func:`render_pipeline`). The other
+                     render options are ignored.
+    :param crossfade: seconds each verse fades into the next one, with the
+                      pcm engine.
+    """
+    if not output_file:
+        output_file = default_output(remix)
+    output_type = output_type_of(output_file)
+    if engine not in RENDER_ENGINES:
+        raise ValueError('Render engine not supported: {}'.format(engine))
+
+    corpus = Corpus(
+        clips, transcripts, debug=debug, force_language=force_language,
+        cache_dir=cache_dir, words=words, windowed=windowed, jobs=jobs, index=index, snap=snap
+    )
+    if clear_cache and corpus.segment_cache is not None:
+        corpus.segment_cache.clear()
+    if output_type == 'video' and not corpus.all_videos():
+        logging.error("Output expect to be a video but input clips aren't all videos")
+        return
+
+    remix_data, remix_lines = read_remix(remix)
+    if pipeline and is_playlist(output_file):
+        raise ValueError('Playlists are rendered progressively, without --pipeline')
+    if pipeline:
+        if remix_data is not None:
+            corpus.validate(remix_data)
+        remix_data = render_pipeline(corpus, output_file, output_type,
+                                     remix_lines=remix_lines, remix_data=remix_data)
+        if dump:
+            logging.info('Dumping remix data in %s', dump)
+            json.dump(remix_data, open(dump, 'w'), indent=2)
+        return
+    if remix_data is None:
+        remix_data = corpus.resolve(remix_lines)
+    corpus.validate(remix_data)
 
     if dump:
         logging.info('Dumping remix data in %s', dump)
         json.dump(remix_data, open(dump, 'w'), indent=2)
 
-    output_clip = make_remix(remix_data, mvp_clips, output_type)
-    method = 'write_videofile' if output_type == 'video' else 'write_audiofile'
-    logging.info('Creating output file')
-    getattr(output_clip, method)(output_file)
+    mvp_clips = LazyClips(output_type)
+    try:
+        render(remix_data, output_file, output_type, mvp_clips,
+               engine=engine, probe_cache=corpus.probe_cache,
+               segment_cache=corpus.segment_cache if incremental else None,
+               preview=preview, captions=captions, chunks=chunks,
+               pcm_cache=corpus.pcm_cache, crossfade=crossfade)
+    finally:
+        mvp_clips.close()
 
 
-def main(args=None):
-    args = docopt(__doc__, argv=args, version=VERSION)
+def file_stamps(filenames):
+    """
+    return the modification time and size of each file of ``filenames``,
+    or ``None`` if it doesn't exist.
+    """
+    stamps = OrderedDict()
+    for filename in filenames:
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            stamps[filename] = None
+        else:
+            stamps[filename] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+def diff_remix(old, new):
+    """
+    compare two parsed remix scripts (see :func:`parse_remix`) and return
+    the lines added, the ones removed and the ones with new offsets.
+
+    >>> diff_remix(parse_remix(['a', 'b+']), parse_remix(['b', 'c']))
+    (['c'], ['a'], ['b'])
+    """
+    added = [line for line in new if line not in old]
+    removed = [line for line in old if line not in new]
+    retimed = [line for line in new if line in old and new[line] != old[line]]
+    return added, removed, retimed
+
+
+def watch(clips, transcripts, remix, output_file=None, dump=None, interval=WATCH_INTERVAL,
+          engine='moviepy', incremental=False, clear_cache=False, preview=False,
+          captions=False, chunks=1, crossfade=0, **kwargs):
+    """
+    render ``remix`` and then render it again each time it or any input
+    file changes, checking them every ``interval`` seconds, until
+    interrupted (Ctrl+C).
+
+    The :class:`Corpus` is kept between renders: only the verses added
+    to the script, or those coming from a changed input, are aligned
+    again, and new offsets only move the cuts. If ``incremental`` (and
+    there is a cache dir), the segments that didn't change are reused
+    (see :func:`render_segments`).
+
+    Other arguments are those of :func:`miau`.
+    """
+    if not output_file:
+        output_file = default_output(remix)
+    output_type = output_type_of(output_file)
+    if engine not in RENDER_ENGINES:
+        raise ValueError('Render engine not supported: {}'.format(engine))
+
+    corpus = Corpus(clips, transcripts, **kwargs)
+    if clear_cache and corpus.segment_cache is not None:
+        corpus.segment_cache.clear()
+    if output_type == 'video' and not corpus.all_videos():
+        logging.error("Output expect to be a video but input clips aren't all videos")
+        return
+
+    mvp_clips = LazyClips(output_type)
+    stamps = OrderedDict()
+    remix_lines = OrderedDict()
+    try:
+        while True:
+            current = file_stamps([remix] + list(clips) + list(transcripts))
+            changed = [filename for filename in current if current[filename] != stamps.get(filename)]
+            if not changed or current[remix] is None:
+                time.sleep(interval)
+                continue
+            inputs = [filename for filename in changed if filename != remix] if stamps else []
+            stamps = current
+            if inputs:
+                logging.info('Inputs changed: %s', ', '.join(inputs))
+                for clip in corpus.refresh(inputs):
+                    mvp_clips.release(clip)
+            try:
+                remix_data, lines = read_remix(remix)
+                if remix_data is None:
+                    added, removed, retimed = diff_remix(remix_lines, lines)
+                    if not (inputs or added or removed or retimed or list(lines) != list(remix_lines)):
+                        continue
+                    logging.info('Remix changed: %s verses added, %s removed, %s retimed',
+                                 len(added), len(removed), len(retimed))
+                    remix_lines = lines
+                    remix_data = corpus.resolve(remix_lines)
+                corpus.validate(remix_data)
+                if dump:
+                    logging.info('Dumping remix data in %s', dump)
+                    json.dump(remix_data, open(dump, 'w'), indent=2)
+                render(remix_data, output_file, output_type, mvp_clips,
+                       engine=engine, probe_cache=corpus.probe_cache,
+                       segment_cache=corpus.segment_cache if incremental else None,
+                       preview=preview, captions=captions, chunks=chunks,
+                       pcm_cache=corpus.pcm_cache, crossfade=crossfade)
+            except (ValueError, subprocess.CalledProcessError) as e:
+                # keep watching: the next save may fix it
+                logging.error(e)
+                continue
+            logging.info('Remix written to %s. Watching for changes', output_file)
+    except KeyboardInterrupt:
+        logging.info('Stopped watching')
+    finally:
+        mvp_clips.close()
+
+
+_worker_clips = {}
+
+
+def _render_task(task, engine='moviepy', probe_cache=None, segment_cache=None, preview=False,
+                 captions=False, chunks=1, pcm_cache=None, crossfade=0):
+    # clips are kept open in each worker process, shared by the remixes it renders
+    remix_data, output_file, output_type = task
+    mvp_clips = _worker_clips.setdefault(output_type, LazyClips(output_type))
+    render(remix_data, output_file, output_type, mvp_clips, engine=engine,
+           probe_cache=probe_cache, segment_cache=segment_cache, preview=preview,
+           captions=captions, chunks=chunks, pcm_cache=pcm_cache, crossfade=crossfade)
+    return output_file
+
+
+def read_manifest(manifest):
+    """
+    read a batch manifest: a json list of remixes, each one
+    a filename or a dictionary with the keys ``remix`` and,
+    optionally, ``output`` and ``dump``. Relative paths are
+    relative to the manifest.
+    """
+    base = os.path.dirname(manifest)
+    with open(manifest) as manifest_fh:
+        items = json.load(manifest_fh)
+    remixes = []
+    for item in items:
+        if not isinstance(item, dict):
+            item = {'remix': item}
+        remixes.append({
+            key: os.path.join(base, item[key]) if item.get(key) else None
+            for key in ('remix', 'output', 'dump')
+        })
+    return remixes
+
 
-    # from the whole input bag, split media files from transcriptions
+def miau_batch(clips, transcripts, remixes, workers=1, engine='moviepy', incremental=False,
+               clear_cache=False, preview=False, captions=False, chunks=1, crossfade=0,
+               **kwargs):
+    """
+    render many remixes from the same inputs in a single process.
+
+    The union of the lines of every remix is aligned at once,
+    and clips are opened once for all the renders.
+
+    :param remixes: list of dictionaries with the keys ``remix`` and,
+                    optionally, ``output`` and ``dump`` (see :func:`miau`).
+    :param workers: number of remixes to render in parallel. Each worker
+                    process keeps its own clips open.
+
+    Other arguments are those of :func:`miau`.
+    """
+    if engine not in RENDER_ENGINES:
+        raise ValueError('Render engine not supported: {}'.format(engine))
+    corpus = Corpus(clips, transcripts, **kwargs)
+    if clear_cache and corpus.segment_cache is not None:
+        corpus.segment_cache.clear()
+
+    scripts = []
+    union = OrderedDict()
+    for item in remixes:
+        output_file = item.get('output') or default_output(item['remix'])
+        output_type = output_type_of(output_file)
+        if output_type == 'video' and not corpus.all_videos():
+            raise ValueError("Output {} expect to be a video but input clips "
+                             "aren't all videos".format(output_file))
+        remix_data, remix_lines = read_remix(item['remix'])
+        if remix_lines is not None:
+            union.update(remix_lines)
+        scripts.append((item, output_file, output_type, remix_data, remix_lines))
+
+    logging.info('Aligning %s lines from %s remixes', len(union), len(remixes))
+    corpus.align(union)
+
+    tasks = []
+    for item, output_file, output_type, remix_data, remix_lines in scripts:
+        if remix_data is None:
+            remix_data = corpus.resolve(remix_lines)
+        corpus.validate(remix_data)
+        if item.get('dump'):
+            logging.info('Dumping remix data in %s', item['dump'])
+            json.dump(remix_data, open(item['dump'], 'w'), indent=2)
+        tasks.append((remix_data, output_file, output_type))
+
+    render_task = partial(
+        _render_task, engine=engine, probe_cache=corpus.probe_cache,
+        segment_cache=corpus.segment_cache if incremental else None,
+        preview=preview, captions=captions, chunks=chunks, pcm_cache=corpus.pcm_cache,
+        crossfade=crossfade
+    )
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for output_file, records in executor.map(partial(_profiled, render_task), tasks):
+                profiler.merge(records)
+                logging.info('Rendered %s', output_file)
+        return
+    try:
+        for task in tasks:
+            logging.info('Rendering %s', task[1])
+            render_task(task)
+    finally:
+        for mvp_clips in _worker_clips.values():
+            mvp_clips.close()
+        _worker_clips.clear()
+
+
+class RemixServer(ThreadingHTTPServer):
+    """
+    an HTTP server rendering remixes of a preloaded :class:`Corpus`.
+
+    Jobs wait in a queue of at most ``queue_size`` and are rendered by
+    ``workers`` threads. Each thread keeps its clips open between jobs
+    and the corpus keeps every line aligned so far. Only the last
+    ``retention`` finished jobs are kept, and their outputs are removed
+    with the server.
+    """
+
+    def __init__(self, address, corpus, workers=2, queue_size=16, engine='moviepy',
+                 incremental=False, preview=False, captions=False, chunks=1, crossfade=0,
+                 retention=JOBS_RETENTION):
+        ThreadingHTTPServer.__init__(self, address, RemixRequestHandler)
+        self.corpus = corpus
+        self.engine = engine
+        self.segment_cache = corpus.segment_cache if incremental else None
+        self.preview = preview
+        self.captions = captions
+        self.chunks = chunks
+        self.crossfade = crossfade
+        self.workdir = tempfile.mkdtemp(prefix='miau-serve-')
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        self.finished = deque()
+        self.retention = retention
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.corpus_lock = threading.Lock()
+        self.workers = [threading.Thread(target=self.work, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, remix_text, output_format='mp4'):
+        """
+        queue a remix given as a script or as json remix data.
+        Return the job or ``None`` if the queue is full.
+        """
+        from moviepy.tools import extensions_dict
+
+        if ('/' in output_format or os.sep in output_format or (
+                output_format not in extensions_dict and
+                '.' + output_format not in PLAYLIST_EXTENSIONS)):
+            raise ValueError('Output format not supported: {}'.format(output_format))
+        job_id = uuid.uuid4().hex
+        output_file = os.path.join(self.workdir, '{}.{}'.format(job_id, output_format))
+        output_type = output_type_of(output_file)
+        if output_type == 'video' and not self.corpus.all_videos():
+            raise ValueError("Output expect to be a video but input clips aren't all videos")
+        try:
+            remix_data, remix_lines = json.loads(remix_text), None
+        except ValueError:
+            remix_data, remix_lines = None, parse_remix(remix_text.splitlines())
+        else:
+            check_remix_data(remix_data)
+        if remix_lines is not None and not remix_lines:
+            raise ValueError('The remix has no verses')
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'output': output_file,
+            'output_type': output_type,
+            'remix_data': remix_data,
+            'remix_lines': remix_lines,
+        }
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            return None
+        with self.jobs_lock:
+            self.jobs[job['id']] = job
+        return job
+
+    def retire(self, job):
+        """
+        keep ``job`` among the finished ones, forgetting the oldest (and
+        removing its files) beyond ``retention``.
+        """
+        with self.jobs_lock:
+            self.finished.append(job['id'])
+            expired = []
+            while len(self.finished) > self.retention:
+                expired.append(self.jobs.pop(self.finished.popleft()))
+        for old in expired:
+            # the output and, for playlists, its segments
+            for filename in glob.glob(os.path.join(self.workdir, old['id'] + '*')):
+                os.remove(filename)
+
+    def work(self):
+        mvp_clips = {}
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            job['status'] = 'running'
+            output_type = job['output_type']
+            try:
+                with self.corpus_lock:
+                    remix_data = job['remix_data'] or self.corpus.resolve(job['remix_lines'])
+                    self.corpus.validate(remix_data)
+                clips = mvp_clips.setdefault(output_type, LazyClips(output_type))
+                render(remix_data, job['output'], output_type, clips,
+                       engine=self.engine, probe_cache=self.corpus.probe_cache,
+                       segment_cache=self.segment_cache, preview=self.preview,
+                       captions=self.captions, chunks=self.chunks,
+                       pcm_cache=self.corpus.pcm_cache, crossfade=self.crossfade)
+            except Exception as e:
+                logging.exception('Job %s failed', job['id'])
+                job['status'] = 'failed'
+                job['error'] = str(e)
+            else:
+                job['status'] = 'done'
+            finally:
+                self.retire(job)
+                self.queue.task_done()
+        for clips in mvp_clips.values():
+            clips.close()
+
+    def server_close(self):
+        for _ in self.workers:
+            self.queue.put(None)
+        ThreadingHTTPServer.server_close(self)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class RemixRequestHandler(BaseHTTPRequestHandler):
+    """
+    ``POST /jobs?format=mp4`` with the remix as body queues a job
+    and returns its id. ``GET /jobs/<id>`` returns its status and
+    ``GET /jobs/<id>/output`` the rendered file.
+
+    With ``format=m3u8`` the output is an HLS playlist, served (with its
+    segments, relative to it) while it's still being rendered.
+    """
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def job_info(self, job):
+        info = {'id': job['id'], 'status': job['status']}
+        if 'error' in job:
+            info['error'] = job['error']
+        return info
+
+    def do_POST(self):
+        path, _, query = self.path.partition('?')
+        if path.rstrip('/') != '/jobs':
+            return self.send_json(404, {'error': 'Not found'})
+        params = dict(p.partition('=')[::2] for p in query.split('&') if p)
+        length = int(self.headers.get('Content-Length', 0))
+        remix_text = self.rfile.read(length).decode('utf-8')
+        try:
+            job = self.server.submit(remix_text, params.get('format', 'mp4'))
+        except ValueError as e:
+            return self.send_json(400, {'error': str(e)})
+        if job is None:
+            return self.send_json(503, {'error': 'Too many jobs queued'})
+        self.send_json(202, self.job_info(job))
+
+    def do_GET(self):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        job = self.server.jobs.get(parts[1]) if len(parts) in (2, 3) else None
+        if job is None or parts[0] != 'jobs':
+            return self.send_json(404, {'error': 'Not found'})
+        if len(parts) == 2:
+            return self.send_json(200, self.job_info(job))
+        playlist = is_playlist(job['output'])
+        if parts[2] == 'output':
+            filename = job['output']
+            content_type = 'application/vnd.apple.mpegurl' if playlist else '{}/{}'.format(
+                job['output_type'], os.path.splitext(filename)[1][1:]
+            )
+        elif playlist and parts[2].startswith(job['id'] + '-') and parts[2].endswith('.mp4'):
+            filename, content_type = os.path.join(self.server.workdir, parts[2]), 'video/mp4'
+        else:
+            return self.send_json(404, {'error': 'Not found'})
+        ready = job['status'] == 'done' or (
+            playlist and job['status'] == 'running' and os.path.exists(filename)
+        )
+        if not ready:
+            return self.send_json(409 if job['status'] == 'failed' else 202, self.job_info(job))
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(os.path.getsize(filename)))
+        self.end_headers()
+        with open(filename, 'rb') as output:
+            shutil.copyfileobj(output, self.wfile)
+
+    def log_message(self, format, *args):
+        logging.info('%s %s', self.address_string(), format % args)
+
+
+def serve(clips, transcripts, host='127.0.0.1', port=8000, workers=2, queue_size=16,
+          engine='moviepy', incremental=False, clear_cache=False, preview=False, captions=False,
+          chunks=1, crossfade=0, **kwargs):
+    """
+    serve remix rendering over HTTP (see :class:`RemixRequestHandler`)
+    until interrupted. Other arguments are those of :func:`miau`.
+    """
+    if engine not in RENDER_ENGINES:
+        raise ValueError('Render engine not supported: {}'.format(engine))
+    corpus = Corpus(clips, transcripts, **kwargs)
+    if clear_cache and corpus.segment_cache is not None:
+        corpus.segment_cache.clear()
+    server = RemixServer((host, port), corpus, workers=workers, queue_size=queue_size,
+                         engine=engine, incremental=incremental, preview=preview,
+                         captions=captions, chunks=chunks, crossfade=crossfade)
+    logging.info('Serving on http://%s:%s (outputs in %s)', host, port, server.workdir)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def split_inputs(patterns):
+    """
+    from the whole input bag, split media files from transcriptions.
+    Raise ``DocoptExit`` if they don't pair.
+    """
     # media and its transcript must be paired (i.e same order)
     # for example, supose a folder with a video file macri_gato.mp4 and
     # its transcription is macri_gato.txt
@@ -320,9 +3419,11 @@ def main(args=None):
     #  *.mp4 *.txt
     #  macri_gato.*
     #  macri_gato.mp4 macri_gato.txt
+    from moviepy.tools import extensions_dict
+
     media = []
     transcripts = []
-    for filename in chain.from_iterable(glob.iglob(pattern) for pattern in args['<input_files>']):
+    for filename in chain.from_iterable(glob.iglob(pattern) for pattern in patterns):
         output_extension = os.path.splitext(filename)[1][1:]
         if output_extension in extensions_dict:
             media.append(filename)
@@ -337,19 +3438,68 @@ def main(args=None):
         raise DocoptExit(
             "Input mismatch: the quantity of inputs and transcriptions differs"
         )
+    return media, transcripts
+
+
+def main(args=None):
+    args = docopt(__doc__, argv=args, version=VERSION)
+    profiler.reset()
+    if args['--profile-stats']:
+        profiler.enable_cprofile()
 
     try:
-        return miau(
-            media,
-            transcripts,
-            args['--remix'],
-            args['--output'],
-            args['--dump'],
+        with profiler.stage('discovery'):
+            media, transcripts = split_inputs(args['<input_files>'])
+        options = dict(
             debug=args['--debug'],
-            force_language=args['--lang']
+            force_language=args['--lang'],
+            cache_dir=None if args['--no-cache'] else os.path.expanduser(args['--cache-dir']),
+            words=args['--words'],
+            windowed=args['--windowed'],
+            jobs=int(args['--jobs']),
+            engine=args['--engine'],
+            incremental=args['--incremental'],
+            clear_cache=args['--clear-cache'],
+            preview=args['--preview'],
+            captions=args['--captions'],
+            index=args['--index'],
+            chunks=int(args['--chunks']),
+            snap=args['--snap'],
+            crossfade=float(args['--crossfade'])
         )
+        if args['serve']:
+            return serve(
+                media, transcripts, host=args['--host'], port=int(args['--port']),
+                workers=int(args['--workers']), queue_size=int(args['--queue']), **options
+            )
+        if len(args['--remix']) == 1 and not args['--manifest'] and args['--watch']:
+            return watch(
+                media, transcripts, args['--remix'][0], args['--output'], args['--dump'],
+                **options
+            )
+        if len(args['--remix']) == 1 and not args['--manifest']:
+            return miau(
+                media,
+                transcripts,
+                args['--remix'][0],
+                args['--output'],
+                args['--dump'],
+                pipeline=args['--pipeline'],
+                **options
+            )
+
+        if args['--output'] or args['--dump']:
+            raise DocoptExit('--output and --dump can only be used with a single remix')
+        if args['--pipeline'] or args['--watch']:
+            raise DocoptExit('--pipeline and --watch can only be used with a single remix')
+        remixes = [{'remix': remix} for remix in args['--remix']]
+        for manifest in args['--manifest']:
+            remixes.extend(read_manifest(manifest))
+        return miau_batch(media, transcripts, remixes, workers=int(args['--workers']), **options)
     except ValueError as e:
         raise DocoptExit(str(e))
+    finally:
+        profiler.dump(args['--profile'], args['--profile-stats'])
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
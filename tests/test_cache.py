@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import miau
+
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='miau-test-')
+        self.cache = miau.DiskCache(os.path.join(self.workdir, 'cache'), max_size=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def write(self, size):
+        fd, filename = tempfile.mkstemp(dir=self.workdir)
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(b'x' * size)
+        return filename
+
+    def test_store_and_lookup(self):
+        key = self.cache.key('a', 1)
+        self.assertIsNone(self.cache.lookup(key, '.bin'))
+        filename = self.cache.store(key, self.write(10), '.bin')
+        self.assertEqual(self.cache.lookup(key, '.bin'), filename)
+        self.assertEqual(os.path.getsize(filename), 10)
+
+    def test_evicts_least_recently_used(self):
+        first = self.cache.store(self.cache.key(1), self.write(60))
+        os.utime(first, (0, 0))
+        second = self.cache.store(self.cache.key(2), self.write(60))
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+    def test_keeps_the_entry_stored(self):
+        older = self.cache.store(self.cache.key(1), self.write(60))
+        # the new entry looks older than the rest, but it was just stored
+        source = self.write(60)
+        os.utime(source, (0, 0))
+        newer = self.cache.store(self.cache.key(2), source)
+        self.assertFalse(os.path.exists(older))
+        self.assertTrue(os.path.exists(newer))
+
+    def test_entry_larger_than_cache(self):
+        source = self.write(1000)
+        self.assertEqual(self.cache.store(self.cache.key(1), source), source)
+        self.assertTrue(os.path.exists(source))
+        self.assertEqual(os.listdir(self.cache.path), [])
+
+    def test_json_larger_than_cache(self):
+        key = self.cache.key(1)
+        self.cache.dump_json(key, ['x' * 1000])
+        self.assertIsNone(self.cache.load_json(key))
+        self.assertEqual(os.listdir(self.cache.path), [])
+
+    def test_concurrent_store(self):
+        cache = miau.DiskCache(os.path.join(self.workdir, 'shared'))
+        errors = []
+
+        def writer():
+            try:
+                for i in range(50):
+                    cache.store(cache.key(i % 5), self.write(10), '.bin')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(os.listdir(cache.path)), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import random
+import unittest
+
+from miau import WordIndex, find_occurrences, fragmenter
+
+
+def replace_passes(source, remix_lines):
+    # the fragmenter before the occurrences were planned: each pass wraps
+    # every occurrence of the lines still fitting, in the order given
+    remix_lines = [line for line in remix_lines if line in source]
+    passes = []
+    while remix_lines:
+        current, not_found = source, []
+        for line in remix_lines:
+            if line not in current:
+                not_found.append(line)
+                continue
+            current = current.replace(line, '\n{}\n'.format(line))
+        passes.append(current.replace('\n ', '\n').replace('\n\n', '\n'))
+        remix_lines = not_found
+    return passes
+
+
+def independent(results, remix_lines):
+    """the lines of ``remix_lines`` being a whole line of some result"""
+    found = set()
+    for result in results:
+        found.update(line.strip() for line in result.split('\n'))
+    return [line for line in remix_lines if line in found]
+
+
+class FindOccurrencesTest(unittest.TestCase):
+
+    def test_leftmost(self):
+        self.assertEqual(
+            find_occurrences('the truth is the true truth', ['truth', 'true', 'lie']),
+            {'truth': 4, 'true': 17}
+        )
+
+    def test_every(self):
+        self.assertEqual(
+            find_occurrences('the truth is the true truth', ['truth', 'true', 'lie'], every=True),
+            {'truth': [4, 22], 'true': [17]}
+        )
+
+
+class FragmenterTest(unittest.TestCase):
+
+    def test_not_found(self):
+        results, not_found = fragmenter(
+            'I have a dream that one day this nation will rise up '
+            'and live out the true meaning of its creed',
+            ['I have a dream', 'out the true', 'the true meaning',
+             'that all men are created equal']
+        )
+        self.assertEqual(len(results), 2)
+        self.assertEqual(not_found, ['that all men are created equal'])
+
+    def test_later_occurrence(self):
+        # 'f e' only fits with 'e f e' in the same pass at its second occurrence
+        source = 'g a c c f c c b g e f e g c c e g c g d d f e e f a d g c c'
+        lines = ['e g', 'g c g d', 'e f e', 'f e']
+        results, not_found = fragmenter(source, lines)
+        self.assertEqual(not_found, [])
+        self.assertEqual(len(results), 2)
+        self.assertEqual(independent(results, lines), lines)
+
+    def test_no_more_passes_than_replacing(self):
+        rand = random.Random(3)
+        for _ in range(2000):
+            words = [rand.choice('abcdefg'[:rand.randint(2, 7)])
+                     for _ in range(rand.randint(5, 40))]
+            source = ' '.join(words)
+            lines = []
+            for _ in range(rand.randint(1, 8)):
+                i = rand.randrange(len(words))
+                lines.append(' '.join(words[i:i + rand.randint(1, 5)]))
+            lines = list(dict.fromkeys(lines))
+            results, not_found = fragmenter(source, lines)
+            self.assertEqual(not_found, [])
+            self.assertEqual(independent(results, lines), lines, source)
+            reference = replace_passes(source, lines)
+            if independent(reference, lines) == lines:
+                self.assertLessEqual(len(results), len(reference), (source, lines))
+
+
+class WordIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = WordIndex('I have a dream that one day I have'.split())
+
+    def test_find(self):
+        self.assertEqual(self.index.find('a dream that'), 2)
+        self.assertEqual(self.index.find('I have'), 0)
+        self.assertEqual(self.index.find('day I have'), 6)
+        self.assertIsNone(self.index.find('dream one'))
+        self.assertIsNone(self.index.find('have a nightmare'))
+        self.assertIsNone(self.index.find(''))
+
+    def test_span(self):
+        self.assertEqual(self.index.source().split('\n'), self.index.words)
+        self.index.align({'fragments': [
+            {'begin': str(i * 0.5), 'end': str(i * 0.5 + 0.4)} for i in range(9)
+        ]})
+        self.assertEqual(self.index.span('a dream that'), (1.0, 2.4))
+        self.assertEqual(self.index.span('have'), (0.5, 0.9))
+        self.assertIsNone(self.index.span('nightmare'))
+
+if __name__ == '__main__':
+    unittest.main()
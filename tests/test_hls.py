@@ -0,0 +1,102 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import miau
+
+from tests.test_render import FPS, count_frames
+
+
+def fragments(filename):
+    """the sequence number and start time, in seconds, of each fragment of ``filename``"""
+    with open(filename, 'rb') as fh:
+        data = fh.read()
+    timescales, track, result = {}, None, []
+    for kind, offset in miau.mp4_boxes(data):
+        wide = data[offset + 8] == 1
+        if kind == b'tkhd':
+            track = struct.unpack_from('>I', data, offset + (28 if wide else 20))[0]
+        elif kind == b'mdhd':
+            timescales[track] = struct.unpack_from('>I', data, offset + (28 if wide else 20))[0]
+        elif kind == b'mfhd':
+            sequence = struct.unpack_from('>I', data, offset + 12)[0]
+        elif kind == b'tfhd':
+            track = struct.unpack_from('>I', data, offset + 12)[0]
+        elif kind == b'tfdt':
+            time = struct.unpack_from('>Q' if wide else '>I', data, offset + 12)[0]
+            result.append((sequence, track, time / float(timescales[track])))
+    return result
+
+
+class HLSTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='miau-test-')
+        self.clip = os.path.join(self.workdir, 'clip.mp4')
+        miau.ffmpeg('-f', 'lavfi', '-i', 'testsrc=duration=8:size=160x120:rate={}'.format(FPS),
+                    '-f', 'lavfi', '-i', 'sine=duration=8', '-c:v', 'libx264', '-c:a', 'aac',
+                    '-shortest', self.clip)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_init_size(self):
+        piece = os.path.join(self.workdir, 'piece.mp4')
+        miau.ffmpeg('-i', self.clip, '-t', 1, '-c:v', 'libx264', '-c:a', 'aac',
+                    *miau.HLS_MUXER + (piece,))
+        with open(piece, 'rb') as fh:
+            data = fh.read()
+        init = miau.init_size(piece)
+        self.assertEqual(data[init + 4:init + 8], b'moof')
+        self.assertNotIn(b'moof', data[:init])
+        with self.assertRaises(ValueError):
+            miau.init_size(self.clip)
+
+    def test_shift_fragments(self):
+        piece = os.path.join(self.workdir, 'piece.mp4')
+        miau.ffmpeg('-i', self.clip, '-t', 2, '-c:v', 'libx264', '-g', FPS, '-c:a', 'aac',
+                    *miau.HLS_MUXER + (piece,))
+        before = fragments(piece)
+        size = os.path.getsize(piece)
+        following = miau.shift_fragments(piece, 1.5, sequence=7)
+        after = fragments(piece)
+        self.assertEqual(os.path.getsize(piece), size)
+        sequences = sorted(set(sequence for sequence, _, _ in after))
+        self.assertEqual(sequences, list(range(7, following)))
+        self.assertEqual(len(after), len(before))
+        for (_, track, old), (_, new_track, new) in zip(before, after):
+            self.assertEqual(track, new_track)
+            self.assertAlmostEqual(new - old, 1.5, places=3)
+
+    def test_playlist(self):
+        remix_data = [
+            ('a', {'clip': self.clip, 'begin': 0.4, 'end': 2.4}),
+            ('b', {'clip': self.clip, 'begin': 3.0, 'end': 4.6}),
+            ('a', {'clip': self.clip, 'begin': 0.4, 'end': 2.4}),
+        ]
+        output = os.path.join(self.workdir, 'remix.m3u8')
+        miau.render_hls(remix_data, output)
+        with open(output) as fh:
+            playlist = fh.read()
+        self.assertIn('#EXT-X-ENDLIST', playlist)
+        self.assertEqual(playlist.count('#EXTINF'), len(remix_data))
+        durations = [data['end'] - data['begin'] for _, data in remix_data]
+        elapsed, sequence = 0, 0
+        for i, duration in enumerate(durations, 1):
+            starts = fragments('{}-{:05d}.mp4'.format(os.path.splitext(output)[0], i))
+            # each segment starts where the previous ones end, numbered after them
+            self.assertGreater(starts[0][0], sequence)
+            for _, _, start in starts:
+                self.assertGreaterEqual(start, elapsed - 0.05)
+            self.assertAlmostEqual(min(start for _, _, start in starts), elapsed, delta=0.05)
+            sequence = max(sequence for sequence, _, _ in starts)
+            elapsed += duration
+        total = sum(durations)
+        self.assertAlmostEqual(miau.media_duration(output), total, delta=miau.DURATION_TOLERANCE)
+        self.assertAlmostEqual(count_frames(output), total * FPS, delta=len(durations))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import miau
+
+
+class TranscriptIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='miau-test-')
+        self.t1 = self.write('t1.txt', 'I have a dream today. I have a dreamer too')
+        self.t2 = self.write('t2.txt', 'and I have a dreamer tomorrow')
+        self.path = os.path.join(self.workdir, 'index.sqlite')
+        self.index = miau.TranscriptIndex(self.path)
+        self.index.update([self.t1, self.t2])
+
+    def tearDown(self):
+        self.index.db.close()
+        shutil.rmtree(self.workdir)
+
+    def write(self, name, text):
+        filename = os.path.join(self.workdir, name)
+        with open(filename, 'w') as fh:
+            fh.write(text)
+        return filename
+
+    def test_locate(self):
+        self.assertEqual(self.index.locate('I have a dream', [self.t1, self.t2]),
+                         [(self.t1, 0), (self.t1, 22), (self.t2, 4)])
+        self.assertEqual(self.index.locate('dreamer t', [self.t2, self.t1]),
+                         [(self.t2, 13), (self.t1, 31)])
+        self.assertEqual(self.index.locate('to', [self.t1]), [(self.t1, 15), (self.t1, 39)])
+
+    def test_locate_is_case_sensitive(self):
+        self.assertEqual(self.index.locate('i have a dream', [self.t1, self.t2]), [])
+
+    def test_locate_only_given_transcripts(self):
+        self.assertEqual(self.index.locate('I have a dreamer', [self.t2]), [(self.t2, 4)])
+
+    def test_route(self):
+        routes, not_found = self.index.route(['a dreamer', 'dream today', 'nightmare'],
+                                             ['c1.mp4', 'c2.mp4'], [self.t1, self.t2])
+        self.assertEqual(routes, [('c1.mp4', self.t1)])
+        self.assertEqual(not_found, ['nightmare'])
+
+    def test_update_unchanged(self):
+        index = miau.TranscriptIndex(self.path)
+        with mock.patch('miau.file_hash') as file_hash:
+            index.update([self.t1, self.t2])
+        file_hash.assert_not_called()
+        index.db.close()
+
+    def test_update_changed(self):
+        self.write('t2.txt', 'a nightmare')
+        stat = os.stat(self.t2)
+        os.utime(self.t2, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.index.update([self.t1, self.t2])
+        self.assertEqual(self.index.locate('nightmare', [self.t1, self.t2]), [(self.t2, 2)])
+        self.assertEqual(self.index.locate('dreamer', [self.t2]), [])
+
+    def test_update_removed(self):
+        os.remove(self.t2)
+        self.index.update([self.t1])
+        self.assertEqual(self.index.locate('dreamer', [self.t1, self.t2]), [(self.t1, 31)])
+
+
+if __name__ == '__main__':
+    unittest.main()
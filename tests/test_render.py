@@ -0,0 +1,141 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import miau
+
+try:
+    import moviepy  # noqa: F401 (ffmpeg comes with it)
+except ImportError:
+    moviepy = None
+
+FPS = 25
+
+
+def frame_times(filename):
+    """the sorted presentation times of the video frames of ``filename``"""
+    output = subprocess.check_output([miau.ffmpeg_binary(), '-loglevel', 'error', '-i', filename,
+                                      '-map', '0:v', '-c', 'copy', '-f', 'framecrc', '-'],
+                                     universal_newlines=True)
+    timebase = [line for line in output.splitlines() if line.startswith('#tb 0:')][0]
+    numerator, denominator = map(int, timebase.split(':')[1].split('/'))
+    return sorted(int(line.split(',')[2]) * numerator / denominator
+                  for line in output.splitlines() if not line.startswith('#'))
+
+
+def count_frames(filename):
+    """the number of video frames of ``filename``"""
+    return len(frame_times(filename))
+
+
+@unittest.skipIf(moviepy is None, 'moviepy is not installed')
+class RenderDurationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='miau-test-')
+        self.clip = os.path.join(self.workdir, 'clip.mp4')
+        # a keyframe every second, so segments are partly stream copied
+        miau.ffmpeg('-f', 'lavfi', '-i', 'testsrc=duration=12:size=160x120:rate={}'.format(FPS),
+                    '-f', 'lavfi', '-i', 'sine=duration=12', '-g', FPS,
+                    '-c:v', 'libx264', '-c:a', 'aac', '-shortest', self.clip)
+        self.remix_data = [
+            ('a', {'clip': self.clip, 'begin': 0.3, 'end': 3.1}),
+            ('b', {'clip': self.clip, 'begin': 4.2, 'end': 7.0}),
+            ('c', {'clip': self.clip, 'begin': 1.13, 'end': 3.95}),
+            ('d', {'clip': self.clip, 'begin': 8.5, 'end': 10.88}),
+        ]
+        self.total = sum(data['end'] - data['begin'] for _, data in self.remix_data)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_ffmpeg_engine(self):
+        output = os.path.join(self.workdir, 'remix.mp4')
+        miau.render_ffmpeg(self.remix_data, output, 'video')
+        self.assertAlmostEqual(miau.media_duration(output), self.total,
+                               delta=miau.DURATION_TOLERANCE)
+        times = frame_times(output)
+        self.assertEqual(len(times), sum(int(round((data['end'] - data['begin']) * FPS))
+                                         for _, data in self.remix_data))
+        # no gaps at the joins
+        for before, after in zip(times, times[1:]):
+            self.assertAlmostEqual(after - before, 1.0 / FPS, delta=0.002)
+
+    def test_ffmpeg_engine_audio(self):
+        output = os.path.join(self.workdir, 'remix.wav')
+        miau.render_ffmpeg(self.remix_data, output, 'audio')
+        self.assertAlmostEqual(miau.media_duration(output), self.total,
+                               delta=miau.DURATION_TOLERANCE)
+
+    def test_segments(self):
+        for extension in ('mp4', 'mp3'):
+            output = os.path.join(self.workdir, 'remix.' + extension)
+            cache = miau.DiskCache(os.path.join(self.workdir, 'segments'))
+            clips = miau.LazyClips('video' if extension == 'mp4' else 'audio')
+            try:
+                miau.render_segments(self.remix_data, output, clips.output_type, clips, cache)
+            finally:
+                clips.close()
+            self.assertAlmostEqual(miau.media_duration(output), self.total,
+                                   delta=miau.DURATION_TOLERANCE)
+
+    def test_repeated_segment(self):
+        remix_data = self.remix_data[:2] + [('a again', self.remix_data[0][1])] + self.remix_data[3:]
+        total = sum(data['end'] - data['begin'] for _, data in remix_data)
+        for extension in ('mp4', 'mp3'):
+            output = os.path.join(self.workdir, 'remix.' + extension)
+            clips = miau.LazyClips('video' if extension == 'mp4' else 'audio')
+            try:
+                miau.render(remix_data, output, clips.output_type, clips)
+            finally:
+                clips.close()
+            self.assertAlmostEqual(miau.media_duration(output), total,
+                                   delta=miau.DURATION_TOLERANCE)
+            if extension == 'mp4':
+                self.assertAlmostEqual(count_frames(output), total * FPS, delta=1)
+
+    def test_pcm_engine_with_small_cache(self):
+        output = os.path.join(self.workdir, 'remix.wav')
+        cache = miau.DiskCache(os.path.join(self.workdir, 'pcm'), max_size=1000)
+        miau.render_pcm(self.remix_data, output, cache=cache)
+        self.assertAlmostEqual(miau.media_duration(output), self.total,
+                               delta=miau.DURATION_TOLERANCE)
+
+    def test_pcm_engine_without_audio(self):
+        silent = os.path.join(self.workdir, 'silent.mp4')
+        miau.ffmpeg('-i', self.clip, '-an', '-c', 'copy', silent)
+        remix_data = [('a', {'clip': silent, 'begin': 0.3, 'end': 3.1})]
+        with self.assertRaises(ValueError):
+            miau.render_pcm(remix_data, os.path.join(self.workdir, 'remix.wav'))
+
+
+class SplitChunksTest(unittest.TestCase):
+
+    def split(self, durations, chunks):
+        remix_data = [(str(i), {'clip': 'clip.mp4', 'begin': 1, 'end': 1 + duration})
+                      for i, duration in enumerate(durations)]
+        pieces = miau.split_chunks(remix_data, chunks)
+        self.assertEqual([verse for _, piece in pieces for verse in piece], remix_data)
+        starts = [0]
+        for _, piece in pieces:
+            starts.append(starts[-1] + sum(data['end'] - data['begin'] for _, data in piece))
+        self.assertEqual([start for start, _ in pieces], starts[:-1])
+        return [len(piece) for _, piece in pieces]
+
+    def test_even(self):
+        self.assertEqual(self.split([1] * 6, 3), [2, 2, 2])
+
+    def test_long_verse(self):
+        self.assertEqual(self.split([1, 1, 1, 10, 1, 1], 3), [3, 1, 2])
+
+    def test_more_chunks_than_verses(self):
+        self.assertEqual(self.split([1, 1], 4), [1, 1])
+
+    def test_single_chunk(self):
+        self.assertEqual(self.split([1, 2, 3], 1), [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.client import HTTPConnection
+
+import miau
+
+
+class RemixServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workdir = tempfile.mkdtemp(prefix='miau-test-')
+        cls.clip = os.path.join(cls.workdir, 'clip.wav')
+        miau.ffmpeg('-f', 'lavfi', '-i', 'sine=duration=3', cls.clip)
+        cls.transcript = os.path.join(cls.workdir, 'clip.txt')
+        with open(cls.transcript, 'w') as fh:
+            fh.write('a tone')
+        cls.corpus = miau.Corpus([cls.clip], [cls.transcript])
+        cls.remix = json.dumps([['a tone', {'clip': cls.clip, 'begin': 0.5, 'end': 2.0}]])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.workdir)
+
+    def start(self, **kwargs):
+        server = miau.RemixServer(('127.0.0.1', 0), self.corpus, engine='pcm', **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        return server
+
+    def request(self, server, method, path, body=None):
+        connection = HTTPConnection(*server.server_address)
+        try:
+            connection.request(method, path, body)
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+        if response.getheader('Content-Type') == 'application/json':
+            data = json.loads(data.decode('utf-8'))
+        return response.status, data
+
+    def test_render(self):
+        server = self.start()
+        status, job = self.request(server, 'POST', '/jobs?format=wav', self.remix)
+        self.assertEqual(status, 202)
+        self.assertEqual(job['status'], 'queued')
+        for _ in range(200):
+            status, info = self.request(server, 'GET', '/jobs/' + job['id'])
+            if info['status'] in ('done', 'failed'):
+                break
+            time.sleep(0.05)
+        self.assertEqual((status, info), (200, {'id': job['id'], 'status': 'done'}))
+        status, output = self.request(server, 'GET', '/jobs/{}/output'.format(job['id']))
+        self.assertEqual(status, 200)
+        self.assertEqual(output[:4], b'RIFF')
+
+    def test_unknown_job(self):
+        server = self.start()
+        self.assertEqual(self.request(server, 'GET', '/jobs/nope')[0], 404)
+        self.assertEqual(self.request(server, 'POST', '/nope', self.remix)[0], 404)
+
+    def test_bad_format(self):
+        server = self.start()
+        for output_format in ('xyz', '..%2Fx', '../x'):
+            status, error = self.request(server, 'POST', '/jobs?format=' + output_format,
+                                         self.remix)
+            self.assertEqual(status, 400)
+            self.assertIn('format', error['error'])
+        self.assertEqual(server.jobs, {})
+
+    def test_bad_remix_data(self):
+        server = self.start()
+        for body in ('{"x": 1}', '[]', '[["line", {"clip": "clip.wav"}]]', '[1, 2]', ''):
+            status, error = self.request(server, 'POST', '/jobs?format=wav', body)
+            self.assertEqual(status, 400, body)
+        self.assertEqual(server.jobs, {})
+
+    def test_full_queue(self):
+        server = self.start(workers=0, queue_size=1)
+        self.assertEqual(self.request(server, 'POST', '/jobs?format=wav', self.remix)[0], 202)
+        status, error = self.request(server, 'POST', '/jobs?format=wav', self.remix)
+        self.assertEqual(status, 503)
+        self.assertEqual(len(server.jobs), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import math
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import wave
+from collections import OrderedDict
+
+import miau
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+RATE = 16000
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class SnapFragmentsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='miau-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def write(self, name, amplitude):
+        """a 6s wav of a tone, with the ``amplitude`` given for each time"""
+        filename = os.path.join(self.workdir, name)
+        out = wave.open(filename, 'wb')
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(RATE)
+        out.writeframes(b''.join(
+            struct.pack('<h', int(amplitude(i / RATE) * 16000 * math.sin(2 * math.pi * 440 * i / RATE)))
+            for i in range(6 * RATE)
+        ))
+        out.close()
+        return filename
+
+    def snap(self, clip, begin, end):
+        fragments = OrderedDict([('verse', {'clip': clip, 'begin': begin, 'end': end})])
+        fragment = miau.snap_fragments(fragments)['verse']
+        return fragment['begin'], fragment['end']
+
+    def test_snaps_to_pauses(self):
+        # pauses between 2.55 and 2.65, and from 3.9 on
+        clip = self.write('pauses.wav', lambda t: 0 if 2.55 <= t < 2.65 or t >= 3.9 else 1)
+        begin, end = self.snap(clip, 2.5, 4.0)
+        self.assertAlmostEqual(begin, 2.6, delta=0.05)
+        self.assertEqual(end, 4.0)
+
+    def test_flat_audio(self):
+        clip = self.write('flat.wav', lambda t: 1)
+        self.assertEqual(self.snap(clip, 2.5, 4.0), (2.5, 4.0))
+
+    def test_noise_level_changes(self):
+        # slightly quieter around 2.6: not a pause
+        clip = self.write('noise.wav', lambda t: 0.8 if 2.55 <= t < 2.65 else 1)
+        self.assertEqual(self.snap(clip, 2.5, 4.0), (2.5, 4.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
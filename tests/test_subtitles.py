@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import miau
+
+SRT = (u'\ufeff1\r\n00:00:01,000 --> 00:00:02,500\r\n<i>I have</i> a dream\r\n\r\n'
+       u'2\r\n00:00:03,000 --> 00:00:04,250\r\nthat one day\r\nthis nation\r\n\r\n'
+       u'3\r\n00:00:05,000 --> 00:00:07,000\r\nwill rise up\r\n')
+
+VTT = (u'WEBVTT\n\nNOTE a comment\n\n'
+       u'00:01.000 --> 00:02.500 align:start position:10%\n<v Martin>I have a dream</v>\n\n'
+       u'intro\n01:00:03.000 --> 01:00:04.250\nthat one day\n')
+
+
+class ReadCuesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='miau-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def write(self, name, content):
+        filename = os.path.join(self.workdir, name)
+        with open(filename, 'w', encoding='utf-8', newline='') as fh:
+            fh.write(content)
+        return filename
+
+    def test_srt(self):
+        self.assertEqual(miau.read_cues(self.write('clip.srt', SRT)), [
+            (1.0, 2.5, 'I have a dream'),
+            (3.0, 4.25, 'that one day this nation'),
+            (5.0, 7.0, 'will rise up'),
+        ])
+
+    def test_vtt(self):
+        self.assertEqual(miau.read_cues(self.write('clip.vtt', VTT)), [
+            (1.0, 2.5, 'I have a dream'),
+            (3603.0, 3604.25, 'that one day'),
+        ])
+
+    def test_read_transcript(self):
+        self.assertEqual(miau.read_transcript(self.write('clip.srt', SRT)),
+                         'I have a dream that one day this nation will rise up')
+        self.assertEqual(miau.read_transcript(self.write('clip.txt', 'I have\na dream')),
+                         'I have a dream')
+
+
+class SubtitlesDatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='miau-test-')
+        self.transcript = os.path.join(self.workdir, 'clip.srt')
+        with open(self.transcript, 'w', encoding='utf-8', newline='') as fh:
+            fh.write(SRT)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    @mock.patch('miau.align_many', return_value=[])
+    def test_whole_cues(self, align_many):
+        remix = miau.parse_remix(['that one day this nation will rise up', 'I have a dream',
+                                  'not said'])
+        fragments = miau.get_subtitles_database(['clip.mp4'], [self.transcript], remix)
+        self.assertEqual(list(fragments.items()), [
+            ('that one day this nation will rise up', {'begin': 3.0, 'end': 7.0, 'clip': 'clip.mp4'}),
+            ('I have a dream', {'begin': 1.0, 'end': 2.5, 'clip': 'clip.mp4'}),
+        ])
+        align_many.assert_called_once_with([], cache=None, jobs=1, audio_cache=None)
+
+    @mock.patch('miau.align_many')
+    def test_inside_cues(self, align_many):
+        align_many.return_value = [{'fragments': [
+            {'begin': '2.5', 'end': '3.1', 'lines': ['a dream that']},
+            {'begin': '3.1', 'end': '4.0', 'lines': ['one day this nation']},
+        ]}]
+        remix = miau.parse_remix(['a dream that'])
+        fragments = miau.get_subtitles_database(['clip.mp4'], [self.transcript], remix,
+                                                force_language='en')
+        self.assertEqual(fragments['a dream that'], {'begin': 2.5, 'end': 3.1, 'clip': 'clip.mp4'})
+        # aligned against its cues only, with the rest of them around
+        tasks = align_many.call_args[0][0]
+        self.assertEqual(tasks, [('clip.mp4', 'I have\na dream that\none day this nation', 'en',
+                                  (0.5, 4.75))])
+
+    @mock.patch('miau.align_many')
+    def test_missed_alignment(self, align_many):
+        align_many.return_value = [{'fragments': [
+            {'begin': '0.5', 'end': '2.0', 'lines': ['I have a']},
+        ]}]
+        remix = miau.parse_remix(['dream that one'])
+        fragments = miau.get_subtitles_database(['clip.mp4'], [self.transcript], remix,
+                                                force_language='en')
+        self.assertEqual(fragments, {})
+
+    def test_not_subtitles(self):
+        transcript = os.path.join(self.workdir, 'clip.txt')
+        with open(transcript, 'w') as fh:
+            fh.write('I have a dream')
+        with mock.patch('miau.align_many', return_value=[]):
+            fragments = miau.get_subtitles_database(['clip.mp4'], [transcript],
+                                                    miau.parse_remix(['I have a dream']))
+        self.assertEqual(fragments, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
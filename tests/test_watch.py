@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import miau
+
+
+class WatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='miau-test-')
+        self.clip = os.path.join(self.workdir, 'clip.wav')
+        miau.ffmpeg('-f', 'lavfi', '-i', 'sine=duration=3', self.clip)
+        self.transcript = os.path.join(self.workdir, 'clip.txt')
+        with open(self.transcript, 'w') as fh:
+            fh.write('a tone')
+        self.remix = os.path.join(self.workdir, 'remix.json')
+        with open(self.remix, 'w') as fh:
+            json.dump([['a tone', {'clip': self.clip, 'begin': 0.5, 'end': 2.0}]], fh)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def watch(self, **kwargs):
+        """render once, stop watching, and return the segment cache given to render"""
+        with mock.patch('miau.render') as render, \
+                mock.patch('miau.time.sleep', side_effect=KeyboardInterrupt):
+            miau.watch([self.clip], [self.transcript], self.remix,
+                       output_file=os.path.join(self.workdir, 'remix.wav'),
+                       cache_dir=os.path.join(self.workdir, 'cache'), **kwargs)
+        self.assertEqual(render.call_count, 1)
+        return render.call_args[1]['segment_cache']
+
+    def test_not_incremental(self):
+        self.assertIsNone(self.watch())
+
+    def test_incremental(self):
+        self.assertIsInstance(self.watch(incremental=True), miau.DiskCache)
+
+
+class DiffRemixTest(unittest.TestCase):
+
+    def test_diff(self):
+        old = miau.parse_remix(['a', 'b+', '# c', 'd'])
+        new = miau.parse_remix(['b', 'c', 'd', '-e'])
+        self.assertEqual(miau.diff_remix(old, new), (['c', 'e'], ['a'], ['b']))
+
+    def test_same(self):
+        remix = miau.parse_remix(['a', '+b-'])
+        self.assertEqual(miau.diff_remix(remix, miau.parse_remix(['a', '+b-'])), ([], [], []))
+
+if __name__ == '__main__':
+    unittest.main()